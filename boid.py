@@ -3,7 +3,7 @@
 __author__ = "amritansh"
 
 # import time
-import pygame
+import array
 # import random
 import math as np
 # import prm
@@ -24,17 +24,202 @@ def guassianFunc(dX, dAvg=10, dSigma=1):
     ) / (2.5066282746310002 * dSigma)
 
 
-class Boid:
+class FlockParameters(object):
+    """
+    Tunable function parameters of the boids. One instance is shared by
+    every boid in a flock, a boid only gets its own copy when one of its
+    parameters is changed
+    """
+    def __init__(self, _radius):
+        """
+        Initializes the parameters to their default values
+        @param _radius The radius of the boids
+        """
+
+        ## The radius of influence used when filtering
+        ## the number of obstacles it needs to check
+        self.obInfluenceR   = 30
+
+        ## The radius of influence used when filtering
+        ## the number of boids it needs to check
+        self.bInfluenceR    = 5 + 2 * _radius
+
+        ## Priori constant for obstacle repulsion (increasing it
+        ## gives more priority to the repulsive obstacle field)
+        self.obBeta         = 1800
+
+        ## Scales the value returned by the sigmoid function
+        ## for goal attraction
+        self.gAlpha         = 0.5
+
+        ## Helps scale the value returned by the sigmoid function
+        ## for goal attraction
+        self.gBeta          = 40
+
+        ## Constant that is used in the sigmoidal curve for goal
+        ## attraction
+        self.gDelta         = -0.7
+
+        ## Priori constant for goal attraction (increasing it
+        ## gives more priority to the attractive goal field)
+        self.gConst         = 60
+
+        ## Scales the value returned by the sigmoid function for
+        ## boid repulsion
+        self.bAlpha         = 30
+
+        ## Helps scale the value returned by the sigmoid function
+        # for boid repulsion
+        self.bBeta          = 30
+
+        ## Constant that is used in the sigmoid curve for boid
+        ## repulsion
+        self.bDelta         = -0.7
+
+        ## Priroi constant for boid repulsion (increasing it
+        ## gives more priority to the repulsive boid field)
+        self.bConst         = 40
+
+        ## Amount of movement in the position buffer needs to be less
+        ## that this value for a boid to be considered stuck
+        self.stuckConst     = 30
+
+        ## The average distance from a neighbour when a boid is stuck.
+        ## Used to pick closer neighbours when stuck to help get out of
+        ## the situation
+        self.stuckDAvg      = 5
+
+        ## The standard deviation for a neighbour probability distribution
+        ## Helps boid pick closer neighbours when it is stuck
+        self.stuckDSigma    = 0.5
+
+        ## The average distance from a neighbour when a boid is not stuck
+        self.nStuckDAvg     = 10
+
+        ## The standard deviation in a neighbour distance distribution when the
+        ## boid is not stuck
+        self.nStuckDSigma   = 1
+
+        ## Maximum x random walk
+        self.randomWalkX    = 7
+
+        ## Maximum y random walk
+        self.randomWalkY    = 7
+
+        ## Weights how much the previous heading affects the new heading.
+        ## A tuple, so the weights of the flock can not be changed in place
+        self.headWeightList = (3, 1)
+
+    def copy(self):
+        """
+        Gets a copy of the parameters
+        @return A new FlockParameters object with the same values
+        """
+        params = FlockParameters.__new__(FlockParameters)
+        params.__dict__.update(self.__dict__)
+        return params
+
+
+class FlockParameter(object):
+    """
+    Boid attribute that is read from the FlockParameters of the boid.
+    Assigning it gives the boid its own copy of the parameters first, so
+    the rest of the flock is not changed
+    """
+    def __init__(self, _name):
+        """
+        Creates the attribute
+        @param _name The name of the parameter
+        """
+
+        ## The name of the parameter
+        self.name = _name
+
+    def __get__(self, b, cls):
+        if b is None:
+            return self
+        return getattr(b.params, self.name)
+
+    def __set__(self, b, value):
+        if not b.ownParams:
+            b.params = b.params.copy()
+            b.ownParams = True
+        setattr(b.params, self.name, value)
+
+
+class BoidState:
+    """
+    Copy of the part of a boid that the rest of the flock reads during an
+    update (position, heading, stuck flag and goal). A list of these is
+    the frame t buffer of the synchronous step mode
+    """
+    def __init__(self, _boid):
+        """
+        Creates a BoidState from a boid
+        @param _boid The boid that will be copied
+        """
+        self.load(_boid)
+
+    def load(self, _boid):
+        """
+        Copies the current state of a boid into this buffer
+        @param _boid The boid that will be copied
+        """
+
+        ## Position of the boid
+        self.position = _boid.position
+
+        ## Heading of the boid
+        self.heading = _boid.heading
+
+        ## Defines if the boid is stuck
+        self.stuck = _boid.stuck
+
+        ## The goal the boid is currently looking at
+        self.goal = _boid.goal
+
+
+class Boid(object):
     """
     Class which represents one boid
     """
+    __slots__ = (
+        "gammaFunc", "prmGen", "screen", "radius", "speed",
+        "dim", "xSize", "ySize", "neighborSize", "color",
+        "obstacleList", "obstacleTree", "goalList", "goalCounter",
+        "goal", "heading", "stuck", "stuck_counter", "sPos", "ePos",
+        "position",
+        "positionRing", "positionHead", "goalNodes", "roadmap",
+        "endIndex", "boidGrid", "flockIndex", "trackGridMoves",
+        "boidList", "params", "ownParams", "gConst", "bConst",
+        "randWalkCount", "DONE", "super_stuck", "compWeightList"
+    )
+
+    obInfluenceR = FlockParameter("obInfluenceR")
+    bInfluenceR = FlockParameter("bInfluenceR")
+    obBeta = FlockParameter("obBeta")
+    gAlpha = FlockParameter("gAlpha")
+    gBeta = FlockParameter("gBeta")
+    gDelta = FlockParameter("gDelta")
+    bAlpha = FlockParameter("bAlpha")
+    bBeta = FlockParameter("bBeta")
+    bDelta = FlockParameter("bDelta")
+    stuckConst = FlockParameter("stuckConst")
+    stuckDAvg = FlockParameter("stuckDAvg")
+    stuckDSigma = FlockParameter("stuckDSigma")
+    nStuckDAvg = FlockParameter("nStuckDAvg")
+    nStuckDSigma = FlockParameter("nStuckDSigma")
+    randomWalkX = FlockParameter("randomWalkX")
+    randomWalkY = FlockParameter("randomWalkY")
+    headWeightList = FlockParameter("headWeightList")
+
     def __init__(
         self, _sPos, _ePos,
         _speed, _xSize, _ySize,
         _neighborSize, _gammaFunc,
         _obstacleList, _goalList,
         _prmGen, _screen, _color,
-        _radius, _position
+        _radius, _position, _params=None
     ):
         """
         Initializes all of the variables given as input to the constructor used
@@ -43,25 +228,26 @@ class Boid:
         @param _sPos The starting position of the boid (some noise added when
         initializing the flock)
         @param _ePos The ending position of the flock
-        @param _xSize The size of the x axis of the pygame screen
+        @param _xSize The size of the x axis of the screen
         @param _neighbourSize The number of neighbours that will influence the
         boid's heading
         @param _obstacleList List of obstacles generated by mapparser
         @param _goalList List of goals used by the boid
         @param _prmGen Object that stores all of the data about the global
         planner
-        @param _screen PyGame screen
+        @param _screen The renderer used to draw the boid
         @param _color Unique color used for debugging purposes
+        @param _params FlockParameters shared by the flock
         @return An instance of a boid
         """
 
         ## Function used to choose a neighbour
-        self.gammaFunc = lambda x: _gammaFunc(x)
+        self.gammaFunc = _gammaFunc
 
         ## Class which holds the details about the global path planner
         self.prmGen = _prmGen
 
-        ## PyGame screen
+        ## The renderer used to draw the boid
         self.screen = _screen
 
         ## Radius of the boid
@@ -83,6 +269,10 @@ class Boid:
         ## List of obstacles that were parsed by mapparser
         self.obstacleList = _obstacleList
 
+        ## BVH over the obstacle list (None means the whole obstacle list
+        ## is checked)
+        self.obstacleTree = None
+
         ## Goals used by the boid
         self.goalList = _goalList
 
@@ -121,14 +311,27 @@ class Boid:
             ) for i in range(20)
         ]
 
-        self.goalNodes = list()
-        self.goalNodes.extend(self.prmGen.goalNodes)
+        # the goal nodes are only replaced (never changed in place), so
+        # the list of the planner is shared until the boid replans
+        self.goalNodes = self.prmGen.goalNodes
         #print self.goalNodes
-        self.roadmap = self.prmGen.roadmap.copy()
+
+        ## The roadmap of the planner with this boid's own edge penalties
+        self.roadmap = self.prmGen.getPenaltyRoadmap()
         self.endIndex = self.goalNodes[-1]
         #print self.roadmap
 
-        self.initFunctionParameters()
+        ## Spatial hash of the flock (None means the whole boid list is
+        ## searched for boids that repel this boid)
+        self.boidGrid = None
+
+        ## Index of the boid in the boid list and in the spatial hash
+        self.flockIndex = None
+
+        ## Defines if the boid moves its own entry in the spatial hash
+        self.trackGridMoves = True
+
+        self.initFunctionParameters(_params)
 
     def sumDivide(self, lt, s):
         """
@@ -256,89 +459,48 @@ class Boid:
         return all(
             map(
                 lambda ob: ob.pointAllowed(self, p),
-                self.obstacleList
+                self.nearObstacles(p, self.radius)
             )
         )
 
-    def initFunctionParameters(self):
-        # function parameters
-
-        ## The radius of influence used when filtering
-        ## the number of obstacles it needs to check
-        self.obInfluenceR   = 30
-
-        ## The radius of influence used when filtering
-        ## the number of boids it needs to check
-        self.bInfluenceR    = 5 + 2 * self.radius
-
-        ## Priori constant for obstacle repulsion (increasing it
-        ## gives more priority to the repulsive obstacle field)
-        self.obBeta         = 1800
-
-        ## Scales the value returned by the sigmoid function
-        ## for goal attraction
-        self.gAlpha         = 0.5
-
-        ## Helps scale the value returned by the sigmoid function
-        ## for goal attraction
-        self.gBeta          = 40
-
-        ## Constant that is used in the sigmoidal curve for goal
-        ## attraction
-        self.gDelta         = -0.7
-
-        ## Priori constant for goal attraction (increasing it
-        ## gives more priority to the attractive goal field)
-        self.gConst         = 60
-
-        ## Scales the value returned by the sigmoid function for
-        ## boid repulsion
-        self.bAlpha         = 30
-
-        ## Helps scale the value returned by the sigmoid function
-        # for boid repulsion
-        self.bBeta          = 30
-
-        ## Constant that is used in the sigmoid curve for boid
-        ## repulsion
-        self.bDelta         = -0.7
-
-        ## Priroi constant for boid repulsion (increasing it
-        ## gives more priority to the repulsive boid field)
-        self.bConst         = 40
+    def nearObstacles(self, p, r):
+        """
+        Gets the obstacles that might be within a radius of a point
+        @param p The point to be checked
+        @param r The radius around the point
+        @return A list of obstacles, in the order of the obstacle list
+        """
+        if self.obstacleTree is None:
+            return self.obstacleList
+        return self.obstacleTree.near(p, r)
 
-        ## Amount of movement in the position buffer needs to be less
-        ## that this value for a boid to be considered stuck
-        self.stuckConst     = 30
+    def initFunctionParameters(self, _params=None):
+        """
+        Sets up the function parameters of the boid. The tunable parameters
+        are read from a FlockParameters object that is shared by the flock
+        @param _params The FlockParameters of the flock (the boid gets its
+        own if none are given)
+        """
 
-        ## The average distance from a neighbour when a boid is stuck.
-        ## Used to pick closer neighbours when stuck to help get out of
-        ## the situation
-        self.stuckDAvg      = 5
+        ## The tunable function parameters
+        self.params = _params
+        if self.params is None:
+            self.params = FlockParameters(self.radius)
 
-        ## The standard deviation for a neighbour probability distribution
-        ## Helps boid pick closer neighbours when it is stuck
-        self.stuckDSigma    = 0.5
+        ## Defines if the parameters belong to this boid alone
+        self.ownParams = _params is None
 
-        ## The average distance from a neighbour when a boid is not stuck
-        self.nStuckDAvg     = 10
+        ## Priori constant for goal attraction. Kept per boid because
+        ## it is reweighted every time the boid gets a new goal
+        self.gConst         = self.params.gConst
 
-        ## The standard deviation in a neighbour distance distribution when the
-        ## boid is not stuck
-        self.nStuckDSigma   = 1
-
-        ## Maximum x random walk
-        self.randomWalkX    = 7
-
-        ## Maximum y random walk
-        self.randomWalkY    = 7
+        ## Priroi constant for boid repulsion. Kept per boid because it
+        ## changes when the boid is done
+        self.bConst         = self.params.bConst
 
         ## Stores the number of times a random walk has occurred
         self.randWalkCount  = 0
 
-        ## Weights how much the previous heading affects the new heading
-        self.headWeightList = [3, 1]
-
         self.DONE = False
 
         self.super_stuck = False
@@ -350,15 +512,56 @@ class Boid:
         """
         self.boidList = _boidList
 
+    def setBoidGrid(self, _boidGrid, _flockIndex, _trackMoves=True):
+        """
+        Setter method used to set the spatial hash of the flock
+        @param _boidGrid The SpatialHash holding the indexes of the boid list
+        @param _flockIndex The index of this boid in the boid list
+        @param _trackMoves If False the grid is rebuilt by the owner once
+        per frame and the boid does not move its entry
+        """
+        self.boidGrid = _boidGrid
+        self.flockIndex = _flockIndex
+        self.trackGridMoves = _trackMoves
+
+    def getPositionBuffer(self):
+        """
+        Gets the positions stored in the position buffer
+        @return A list of positions, oldest first
+        """
+        size = len(self.positionRing) // 2
+        return [
+            (
+                self.positionRing[2 * k],
+                self.positionRing[2 * k + 1]
+            ) for k in [(self.positionHead + i) % size for i in range(size)]
+        ]
+
+    def setPositionBuffer(self, posList):
+        """
+        Fills the position buffer
+        @param posList A list of positions, oldest first
+        """
+        self.positionRing = array.array(
+            "d",
+            [c for p in posList for c in p]
+        )
+        self.positionHead = 0
+
+    ## Recent positions of the boid (stored as a flat ring buffer)
+    positionBuffer = property(getPositionBuffer, setPositionBuffer)
+
     def updatePositionBuffer(self):
         """
         Updates the position buffer
         @return The displacement of a boid over a certain number of frames
         """
-        self.positionBuffer += [self.position]
-        del self.positionBuffer[0]
-        xDiff = self.positionBuffer[-1][0] - self.positionBuffer[0][0]
-        yDiff = self.positionBuffer[-1][1] - self.positionBuffer[0][1]
+        ring = self.positionRing
+        ring[2 * self.positionHead] = self.position[0]
+        ring[2 * self.positionHead + 1] = self.position[1]
+        self.positionHead = (self.positionHead + 1) % (len(ring) // 2)
+        xDiff = self.position[0] - ring[2 * self.positionHead]
+        yDiff = self.position[1] - ring[2 * self.positionHead + 1]
         return abs(xDiff) + abs(yDiff)
 
     def findMax(self, searchThrough, counter):
@@ -372,9 +575,7 @@ class Boid:
         searchList = list()
         searchList.extend(searchThrough)
         for _ in range(counter):
-            maxPos = [
-                i for i,j in enumerate(searchList) if j == max(searchList)
-            ][0]
+            maxPos = searchList.index(max(searchList))
             maxList += [maxPos]
             searchList[maxPos] = 0
         return maxList
@@ -427,7 +628,7 @@ class Boid:
                 o.getPoint(self.position),
                 self.position
             ) < self.obInfluenceR,
-            self.obstacleList
+            self.nearObstacles(self.position, self.obInfluenceR)
         )
         magnitudeList = map(
             lambda o: self.obstacleFunc(
@@ -493,6 +694,13 @@ class Boid:
         @return A list of scaled vectors that will be used to determine the
         influence of the boids on the heading. ALso returns the sum of the potential
         """
+        if self.boidGrid is None:
+            candidates = self.boidList
+        else:
+            candidates = self.getVar(
+                self.boidList,
+                self.boidGrid.query(self.position, self.bInfluenceR)
+            )
         influenceBo = filter(
             lambda b: self.norm(
                 self.position,
@@ -503,7 +711,7 @@ class Boid:
                 b.position
             ) > 0 and
              not self.inGoal(b.position),
-             self.boidList
+             candidates
         )
         magnitudeList = map(
             lambda bo: self.sigmoidFunc(
@@ -594,20 +802,15 @@ class Boid:
         When the boid is stuck, it reweights the roadmap and
         finds a new suitable path.
         """
-        minIndex = 0
-        currentMinDistance = 0
-        for i, k in enumerate(self.prmGen.subGoalPositionList):
-            if i == 0:
-                currentMinDistance = self.norm(k, self.position)
-                continue
-            tempDist = self.norm(k, self.position)
-            if tempDist < currentMinDistance and not i in self.goalNodes:
-                currentMinDistance = tempDist
-                minIndex = i
+        # the start node is always allowed, the rest of the nodes on the
+        # current path are not
+        minIndex = self.prmGen.sampleTree.nearest(
+            self.position,
+            set(self.goalNodes) - set([0])
+        )
 
         for gni in self.goalNodes[self.goalCounter:self.goalCounter + 4]:
-            for key in self.roadmap[gni].keys():
-                self.roadmap[gni][key] *= 3
+            self.roadmap.penalize(gni, 3)
 
         self.goalNodes = self.prmGen.getShortestPath(
             self.roadmap,
@@ -652,7 +855,10 @@ class Boid:
             if self.inGoal(self.position):
                 self.setNewGoal()
 
-            for obstacle in self.obstacleList:
+            for obstacle in self.nearObstacles(
+                self.position,
+                min_obstacle_dist
+            ):
                 c_point = obstacle.getPoint(self.position)
                 if self.norm(c_point, self.position) < min_obstacle_dist:
                     obstacles_too_close = True
@@ -719,6 +925,8 @@ class Boid:
             self.position[1] + self.heading[1]
         )
         if self.inWorld(newPos) and self.pointAllowed(newPos):
+            if self.boidGrid is not None and self.trackGridMoves:
+                self.boidGrid.move(self.flockIndex, self.position, newPos)
             self.position = newPos
 
         movement_val = self.updatePositionBuffer()
@@ -731,11 +939,12 @@ class Boid:
 
     def draw(self):
         """
-        Draws the boid as a pygame circle in the pygame screen
+        Draws the boid as a circle with the renderer
         """
+        if not self.screen.visual:
+            return
         try:
-            pygame.draw.lines(
-                self.screen,
+            self.screen.lines(
                 # (238, 130, 238),
                 # (227, 159, 181),
                 (181, 53, 93),
@@ -746,8 +955,7 @@ class Boid:
         except ValueError:
             pass
 
-        pygame.draw.circle(
-            self.screen,
+        self.screen.circle(
             # (0, 255, 100) if self.stuck else (0, 255, 255),
             # (255, 0, 0) if self.stuck else (255, 0, 0),
             (255, 0, 0) if self.stuck else (0, 0, 181),
@@ -1,9 +1,18 @@
 __author__ = "amritansh"
 
-import pygame
+import boid
 import configuration
+import renderer
+import spatialhash
 import time
 
+try:
+    import flockengine
+    import parallelflock
+except ImportError:
+    flockengine = None
+    parallelflock = None
+
 
 class FlockSim:
     """
@@ -19,14 +28,17 @@ class FlockSim:
         **kwargs
     ):
         """
-        Initializes the flock and the display mechanism (PyGame)
+        Initializes the flock and the display mechanism (the renderer)
         @param flockSize The size of the flock (number of boids)
         @param startPoint The macro starting position of the flock
         @param endPoint The last goal point for the flock
         @param _mapFile The file containing details about the obstacles
         @param _dataFile The file that the data will be exported to
+        @param renderer The renderer, "pygame" (a window), "file" (frames
+        saved to frame_pattern) or "null" (nothing is drawn)
+        @param frame_pattern Path of the frames of the file renderer,
+        formatted with the frame number
         """
-        pygame.init()
 
         ## Tells if the flock has reached the end goal (used again
         ## to see if the escape or space bar were hit to stop the rendering)
@@ -38,11 +50,17 @@ class FlockSim:
         ## Defines the color white
         self.WHITE = (255, 255, 255)
 
-        ## The font that is used for displaying the frame number
-        self.font = pygame.font.Font(None, 50)
+        ## The dimensions of the screen
+        self.dim = xSize, ySize = configuration.Configuration.dim
 
-        ## The dimensions of the PyGame screen
-        self.dim = xSize, ySize = 1000, 600
+        ## The renderer that draws the simulation. Only the pygame and
+        ## file renderers load pygame
+        self.renderer = renderer.makeRenderer(
+            kwargs.get("renderer", "pygame"),
+            self.dim,
+            kwargs.get("frame_pattern", None)
+        )
+        configuration.Configuration.screen = self.renderer
 
         ## The configuration object (in this case the configuration
         ## is defined by an exterior file)
@@ -87,6 +105,51 @@ class FlockSim:
 
         self.random_seed = kwargs.get("random_seed", None)
 
+        ## Use a precomputed distance field for the static obstacles
+        self.distanceField = kwargs.get("distance_field", False)
+
+        ## Only check the roadmap edges for collisions once a path uses them
+        self.lazyPRM = kwargs.get("lazy_prm", False)
+
+        ## The sampler that places the roadmap sample points, one of
+        ## "uniform", "halton", "gaussian", "bridge" and "medial_axis"
+        self.sampler = kwargs.get("sampler", "uniform")
+
+        ## How the roadmap sample points are connected. "fixed" uses a
+        ## fixed radius and number of neighbours, "prm_star" scales them
+        ## with the number of sample points
+        self.connection = kwargs.get("connection", "fixed")
+
+        ## Largest number of times per second the roadmap is redrawn
+        ## while it is built (only on a display, 0 never redraws it)
+        self.progressRate = kwargs.get("progress_rate", 10)
+
+        ## The engine used to update the flock. None updates every boid
+        ## with Boid.update, "vectorized" steps the whole flock with the
+        ## NumPy FlockEngine and "parallel" splits the FlockEngine step
+        ## across a pool of worker processes
+        self.engine = kwargs.get("engine", None)
+
+        ## Number of worker processes used by the parallel engine (one
+        ## per core by default)
+        self.workers = kwargs.get("workers", None)
+
+        ## The FlockEngine instance (only used by the vectorized engine)
+        self.flockEngine = None
+
+        ## Spatial hash of the boid positions used for boid repulsion
+        self.boidGrid = None
+
+        ## How the boids are updated within a frame. "sequential" updates
+        ## the boids one after the other, so later boids see the new state
+        ## of earlier ones. "synchronous" makes every boid read the state
+        ## of the flock at the start of the frame. The vectorized engine
+        ## is always synchronous
+        self.stepMode = kwargs.get("step_mode", "sequential")
+
+        ## Frame t buffer read by the boids in the synchronous step mode
+        self.readBuffer = list()
+
     def avg(self, l):
         """
         Gets the average of a list
@@ -179,7 +242,12 @@ class FlockSim:
             map_file=self.mapFile,
             dynamic_obstacles=self.obstacleFile,
             auto_gen_obst=self.auto_gen_obst,
-            auto_gen_number=self.auto_gen_number
+            auto_gen_number=self.auto_gen_number,
+            distance_field=self.distanceField,
+            lazy_prm=self.lazyPRM,
+            sampler=self.sampler,
+            connection=self.connection,
+            progress_rate=self.progressRate
         )
 
         if self.dataFile:
@@ -192,6 +260,52 @@ class FlockSim:
             self.config.boidList
         )
 
+        if self.engine in ("vectorized", "parallel") and flockengine is None:
+            raise ImportError("the " + self.engine + " engine requires numpy")
+
+        if self.engine == "vectorized":
+            self.flockEngine = flockengine.FlockEngine(
+                self.config.boidList,
+                self.config.boidObstacleList
+            )
+        elif self.engine == "parallel":
+            self.flockEngine = parallelflock.ParallelFlockEngine(
+                self.config.boidList,
+                self.config.boidObstacleList,
+                self.workers
+            )
+        else:
+            # in the sequential mode the boids keep the grid up to date as
+            # they move, in the synchronous mode it is rebuilt every frame
+            sequential = self.stepMode == "sequential"
+            self.boidGrid = spatialhash.SpatialHash(
+                max(b.bInfluenceR for b in self.config.boidList)
+            )
+            self.boidGrid.rebuild([b.position for b in self.config.boidList])
+            for i, b in enumerate(self.config.boidList):
+                b.setBoidGrid(self.boidGrid, i, sequential)
+
+            if not sequential:
+                self.readBuffer = [
+                    boid.BoidState(b) for b in self.config.boidList
+                ]
+                map(
+                    lambda b: b.setBoidList(self.readBuffer),
+                    self.config.boidList
+                )
+
+    def stepSynchronous(self):
+        """
+        Updates every boid from a frozen copy of the flock. The boids read
+        the frame t buffer and write their frame t + 1 state into
+        themselves, then the buffer is refilled for the next frame, so the
+        result does not depend on the order of the boid list
+        """
+        for state, b in zip(self.readBuffer, self.config.boidList):
+            state.load(b)
+        self.boidGrid.rebuild([state.position for state in self.readBuffer])
+        map(lambda b: b.update(), self.config.boidList)
+
     def render(self, forPlay=False):
         """
         Renders the scene. This means that the time taken for the boids to
@@ -201,18 +315,27 @@ class FlockSim:
         recorded for animation
         """
         self.init_prm()
-        pygame.display.set_caption('Rendering...')
+        # the worker pool of the parallel engine is stopped even when the
+        # window is closed (exit) or a step fails
+        try:
+            self.renderFrames(forPlay)
+        finally:
+            if self.flockEngine is not None:
+                self.flockEngine.close()
+
+    def renderFrames(self, forPlay):
+        """
+        Steps and draws the frames of the scene until every boid reached
+        the end goal, the iteration limit is reached or space is pressed
+        @param forPlay Specifies if the surface data should be
+        recorded for animation
+        """
+        self.renderer.setCaption('Rendering...')
         #print 'I am working, I promise'
         self.startTime = time.time()
         while not self.done and self.counter < self.iterations:
             self.frameCounter += 1
-            frame = pygame.Surface(
-                (
-                    self.config.xSize,
-                    self.config.ySize
-                )
-            )
-            self.config.screen.fill(self.WHITE)
+            self.renderer.fill(self.WHITE)
             boidPosList = [
                 b.position for b in self.config.boidList
             ]
@@ -221,9 +344,16 @@ class FlockSim:
             ]
 
             # updates the boids and gathers the statistics
-            map(lambda o: o.draw(), self.config.obstacleList)
-            map(lambda b: b.draw(), self.config.boidList)
-            map(lambda b: b.update(), self.config.boidList)
+            map(lambda o: o.update(), self.config.obstacleList)
+            if self.renderer.visual:
+                map(lambda o: o.draw(), self.config.obstacleList)
+                map(lambda b: b.draw(), self.config.boidList)
+            if self.flockEngine is not None:
+                self.flockEngine.step()
+            elif self.stepMode == "synchronous":
+                self.stepSynchronous()
+            else:
+                map(lambda b: b.update(), self.config.boidList)
             self.numInGoal = len(
                 filter(
                     lambda b: b.goalCounter == len(b.goalList) - 1,
@@ -237,41 +367,39 @@ class FlockSim:
             #map(lambda g: g.draw(), self.config.goalList)
             self.config.prmGen.drawPath()
 
-            frame.blit(self.config.screen, (0, 0))
-            if forPlay:
-                self.surfaceList += [frame]
-            key = pygame.key.get_pressed()
-            if key[pygame.K_SPACE]:
+            if forPlay and self.renderer.visual:
+                self.surfaceList += [self.renderer.capture()]
+            if self.renderer.pressed("space"):
                 self.done = True
-            for e in pygame.event.get():
-                if e.type is pygame.QUIT:
-                    exit()
+            if self.renderer.quitRequested():
+                exit()
             self.counter += 1
-            pygame.display.flip()
+            self.renderer.present()
 
             if self.numInGoal == self.flockSize:
                 self.done = True
 
-
     def play(self):
         """
         Plays the scene after it has rendered. Iterates through
         surfaces that have been stored in surfaceList and blits
-        the new surface on the screen
+        the new surface on the screen. Only a renderer with a display
+        can play the scene
         """
-        self.config.screen.fill(self.WHITE)
-        pygame.display.set_caption('Playing...')
+        if not self.renderer.interactive:
+            return
+        self.renderer.fill(self.WHITE)
+        self.renderer.setCaption('Playing...')
         self.counter = 0
         self.done = False
         while not self.done:
-            key = pygame.key.get_pressed()
-            if key[pygame.K_LEFT]:
+            if self.renderer.pressed("left"):
                 self.counter -= 1
                 time.sleep(0.04)
-            elif key[pygame.K_RIGHT]:
+            elif self.renderer.pressed("right"):
                 self.counter += 1
                 time.sleep(0.04)
-            elif key[pygame.K_ESCAPE]:
+            elif self.renderer.pressed("escape"):
                 exit()
 
             #constrains the self.counter
@@ -279,16 +407,12 @@ class FlockSim:
                 self.counter = len(self.surfaceList)-1
             elif self.counter < 0:
                 self.counter = 0
-            self.config.screen.blit(
-                self.surfaceList[self.counter],
-                (0, 0)
-            )
-            text = self.font.render(
+            self.renderer.show(self.surfaceList[self.counter])
+            self.renderer.text(
                 'Frame: ' + str(self.counter),
-                0,
+                (0, 0),
                 self.BLACK
             )
-            self.config.screen.blit(text, (0, 0))
 
             # if self.random_seed:
                 # random_seed = self.font.render(
@@ -298,10 +422,9 @@ class FlockSim:
                 # )
                 # self.config.screen.blit(random_seed, (0, 30))
 
-            pygame.display.flip()
-            for e in pygame.event.get():
-                if e.type is pygame.QUIT:
-                    exit()
+            self.renderer.present()
+            if self.renderer.quitRequested():
+                exit()
 
 if __name__ == '__main__':
     FlockSim(
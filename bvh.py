@@ -0,0 +1,262 @@
+__author__ = "amritansh"
+
+
+def union(b1, b2):
+    """
+    Gets the smallest box that holds two boxes
+    @param b1, b2 Boxes as [min x, min y, max x, max y]
+    @return The enclosing box
+    """
+    return [
+        min(b1[0], b2[0]),
+        min(b1[1], b2[1]),
+        max(b1[2], b2[2]),
+        max(b1[3], b2[3])
+    ]
+
+
+class BVH:
+    """
+    Bounding volume hierarchy over a list of axis aligned boxes. Every
+    node holds the box around its subtree, so a query only descends into
+    the parts of the tree whose boxes it touches. Queries are
+    conservative, they return every box that the query shape touches
+    (boundaries included) and the caller does the exact test. Boxes can
+    be moved after the tree is built, the boxes above them are refit
+    """
+    def __init__(self, _boxes):
+        """
+        Builds the tree
+        @param _boxes The list of boxes as [min x, min y, max x, max y],
+        the index of a box in the list is the value returned by the queries
+        """
+
+        ## Box of every node
+        self.boxes = list()
+
+        ## Children of every node (None for the leaves)
+        self.left = list()
+        self.right = list()
+
+        ## Parent of every node (None for the root)
+        self.parent = list()
+
+        ## Index of the box stored in every leaf (None for inner nodes)
+        self.item = list()
+
+        ## Maps the index of a box to its leaf
+        self.leaves = [None] * len(_boxes)
+
+        ## The root node, None when the tree is empty
+        self.root = self.build(
+            [(list(box), k) for k, box in enumerate(_boxes)],
+            None
+        )
+
+    def build(self, entries, parent):
+        """
+        Builds the subtree of a list of boxes by splitting the longest side
+        of their enclosing box at the median
+        @param entries The (box, index) pairs in the subtree
+        @param parent The parent of the subtree
+        @return The root node of the subtree
+        """
+        if not entries:
+            return None
+        node = len(self.boxes)
+        self.boxes.append(reduce(union, [box for box, _ in entries]))
+        self.left.append(None)
+        self.right.append(None)
+        self.parent.append(parent)
+        self.item.append(None)
+        if len(entries) == 1:
+            self.item[node] = entries[0][1]
+            self.leaves[entries[0][1]] = node
+            return node
+        box = self.boxes[node]
+        axis = 0 if box[2] - box[0] >= box[3] - box[1] else 1
+        entries = sorted(
+            entries,
+            key=lambda e: (e[0][axis] + e[0][axis + 2], e[1])
+        )
+        mid = len(entries) // 2
+        self.left[node] = self.build(entries[:mid], node)
+        self.right[node] = self.build(entries[mid:], node)
+        return node
+
+    def update(self, k, box):
+        """
+        Moves a box and refits the boxes above it
+        @param k The index of the box
+        @param box The new box
+        """
+        node = self.leaves[k]
+        self.boxes[node] = list(box)
+        node = self.parent[node]
+        while node is not None:
+            self.boxes[node] = union(
+                self.boxes[self.left[node]],
+                self.boxes[self.right[node]]
+            )
+            node = self.parent[node]
+
+    def query(self, touches):
+        """
+        Gets the boxes that a shape touches
+        @param touches Function that tells if the shape touches a box
+        @return A sorted list of the indexes of the boxes
+        """
+        found = list()
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            if not touches(self.boxes[node]):
+                continue
+            if self.item[node] is not None:
+                found.append(self.item[node])
+            else:
+                stack += [self.right[node], self.left[node]]
+        found.sort()
+        return found
+
+    def queryBox(self, box):
+        """
+        Gets the boxes that overlap a box
+        @param box The box as [min x, min y, max x, max y]
+        @return A sorted list of the indexes of the boxes
+        """
+        return self.query(lambda b: (
+            b[0] <= box[2] and box[0] <= b[2] and
+            b[1] <= box[3] and box[1] <= b[3]
+        ))
+
+    def queryPoint(self, p, r):
+        """
+        Gets the boxes that are no further than a radius from a point
+        @param p The point to be checked
+        @param r The radius around the point
+        @return A sorted list of the indexes of the boxes
+        """
+        def touches(b):
+            dx = max(b[0] - p[0], 0, p[0] - b[2])
+            dy = max(b[1] - p[1], 0, p[1] - b[3])
+            return dx * dx + dy * dy <= r * r
+        return self.query(touches)
+
+    def querySegment(self, p, q):
+        """
+        Gets the boxes that the segment <p, q> passes through
+        @param p The starting point of the segment
+        @param q The ending point of the segment
+        @return A sorted list of the indexes of the boxes
+        """
+        dx, dy = q[0] - p[0], q[1] - p[1]
+        lo = (min(p[0], q[0]), min(p[1], q[1]))
+        hi = (max(p[0], q[0]), max(p[1], q[1]))
+
+        def touches(b):
+            if b[0] > hi[0] or lo[0] > b[2] or b[1] > hi[1] or lo[1] > b[3]:
+                return False
+            # the line misses the box when every corner is strictly on
+            # the same side of it
+            sides = [
+                dx * (y - p[1]) - dy * (x - p[0])
+                for x in (b[0], b[2]) for y in (b[1], b[3])
+            ]
+            return not (min(sides) > 0 or max(sides) < 0)
+        return self.query(touches)
+
+
+class ObstacleTree:
+    """
+    BVH over the bounding boxes of a list of obstacles. Obstacles without
+    a bounding box (such as a distance field) are returned by every query.
+    The boxes of the dynamic obstacles are refit before every query, so
+    the results always match the current positions of the obstacles
+    """
+    def __init__(self, _obstacleList):
+        """
+        Builds the tree
+        @param _obstacleList The list of obstacles
+        """
+
+        ## The obstacles in the tree
+        self.obstacleList = list(_obstacleList)
+
+        ## Indexes of the obstacles that have a bounding box
+        self.bounded = [
+            k for k, ob in enumerate(self.obstacleList)
+            if hasattr(ob, "getBounds")
+        ]
+
+        ## Indexes of the obstacles that every query returns
+        self.unbounded = [
+            k for k, ob in enumerate(self.obstacleList)
+            if not hasattr(ob, "getBounds")
+        ]
+
+        ## Indexes (into bounded) of the obstacles that can move
+        self.dynamic = [
+            i for i, k in enumerate(self.bounded)
+            if getattr(self.obstacleList[k], "dynamic", False)
+        ]
+
+        ## The tree over the boxes of the bounded obstacles
+        self.tree = BVH([self.obstacleList[k].getBounds() for k in self.bounded])
+
+    def refit(self):
+        """
+        Moves the boxes of the dynamic obstacles that have moved
+        """
+        for i in self.dynamic:
+            box = self.obstacleList[self.bounded[i]].getBounds()
+            if box != self.tree.boxes[self.tree.leaves[i]]:
+                self.tree.update(i, box)
+
+    def collect(self, found):
+        """
+        Gets the obstacles of a query
+        @param found The indexes (into bounded) returned by the tree
+        @return The obstacles, in the order of the obstacle list
+        """
+        indexes = [self.bounded[i] for i in found] + self.unbounded
+        if self.unbounded:
+            indexes.sort()
+        return [self.obstacleList[k] for k in indexes]
+
+    def near(self, p, r):
+        """
+        Gets the obstacles that might be within a radius of a point
+        @param p The point to be checked
+        @param r The radius around the point
+        @return The list of candidate obstacles
+        """
+        self.refit()
+        return self.collect(self.tree.queryPoint(p, r))
+
+    def alongSegment(self, p, q):
+        """
+        Gets the obstacles that might collide with the segment <p, q>.
+        PolyObstacle.detectCollision checks the edges against the bounding
+        box of the segment (not only the segment itself), so the box is
+        what the tree is queried with
+        @param p The starting point of the segment
+        @param q The ending point of the segment
+        @return The list of candidate obstacles
+        """
+        self.refit()
+        return self.collect(self.tree.queryBox([
+            min(p[0], q[0]),
+            min(p[1], q[1]),
+            max(p[0], q[0]),
+            max(p[1], q[1])
+        ]))
+
+    def inBox(self, box):
+        """
+        Gets the obstacles that might overlap a box
+        @param box The box as [min x, min y, max x, max y]
+        @return The list of candidate obstacles
+        """
+        self.refit()
+        return self.collect(self.tree.queryBox(box))
@@ -1,14 +1,20 @@
 __author__ = "amritansh"
 
+import colorsys
 import math
 import random
-import pygame
-import pygame.color as color
 
 import boid
+import bvh
+import renderer
 import mapparser as mp
 from prm import PRMGenerator
 
+try:
+    import distancefield
+except ImportError:
+    distancefield = None
+
 
 class Configuration:
     """
@@ -31,14 +37,16 @@ class Configuration:
     ## a boid's heading
     numNeighbours = 3
 
-    ## The screen used to draw the simluation
-    screen = pygame.display.set_mode(dim)
+    ## The renderer used to draw the simluation. Nothing is drawn until
+    ## FlockSim selects a visual renderer
+    screen = renderer.NullRenderer(dim)
 
-    ## The list of colors (used for debugging purposes)
-    colorList = map(
-        lambda k: color.THECOLORS[k],
-        color.THECOLORS.keys()
-    )
+    ## The list of colors (used for debugging purposes), evenly spaced
+    ## hues so the list does not need pygame
+    colorList = [
+        tuple(int(255 * c) for c in colorsys.hsv_to_rgb(k / 32.0, 1, 1))
+        for k in range(32)
+    ]
 
     boid_radius = 4
 
@@ -193,6 +201,17 @@ class PolyFileConfiguration(Configuration):
         @param endPoint The ending point for the boids
         @param flockSize The size of the flock (number of boids)
         @param filename The name of the file that contains the environment map
+        @param distance_field Replaces the static obstacles of the boids
+        with a precomputed signed distance field
+        @param lazy_prm Defines if the roadmap edges are only checked for
+        collisions once a path uses them
+        @param sampler The name of the sampler that places the roadmap
+        sample points
+        @param connection How the roadmap sample points are connected,
+        "fixed" or "prm_star"
+        @param progress_rate Largest number of times per second the
+        roadmap is redrawn while it is built on a display (0 never
+        redraws it)
         """
         ## List of obstacles
         # parse static obstalces
@@ -222,11 +241,51 @@ class PolyFileConfiguration(Configuration):
             Configuration.xSize,
             Configuration.ySize,
             Configuration.numSamplePoints,
-            Configuration.screen
+            Configuration.screen,
+            kwargs.get("sampler", "uniform")
         )
+        self.prmGen.lazy = kwargs.get("lazy_prm", False)
+        self.prmGen.connection = kwargs.get("connection", "fixed")
+        progressRate = kwargs.get("progress_rate", 10)
+        if Configuration.screen.interactive and progressRate:
+            self.prmGen.progress = renderer.Throttle(
+                self.prmGen.drawProgress,
+                progressRate
+            )
+
+        ## BVH over the obstacle list, shared with the obstacles so they
+        ## only check the obstacles around them for collisions
+        self.obstacleTree = self.prmGen.obstacleTree
+        for obst in self.obstacleList:
+            obst.obstacleTree = self.obstacleTree
 
         ## List of intermediate goals derived by the global planner
         self.goalList = self.prmGen.generate(Configuration.goalRadius)
+        if isinstance(self.prmGen.progress, renderer.Throttle):
+            # the throttle can have dropped the progress of the last
+            # sample points
+            self.prmGen.progress.flush()
+
+        ## Obstacles the boids check against. With a distance field the
+        ## static obstacles are replaced by one precomputed field
+        self.boidObstacleList = self.obstacleList
+        staticObstacles = [
+            obst for obst in self.obstacleList if not obst.dynamic
+        ]
+        if kwargs.get("distance_field", False) and staticObstacles:
+            if distancefield is None:
+                raise ImportError("the distance field requires numpy")
+            self.distanceField = distancefield.DistanceField(
+                staticObstacles,
+                Configuration.xSize,
+                Configuration.ySize
+            )
+            self.boidObstacleList = [self.distanceField] + [
+                obst for obst in self.obstacleList if obst.dynamic
+            ]
+
+        ## Function parameters shared by every boid in the flock
+        self.flockParams = boid.FlockParameters(Configuration.boid_radius)
 
         ## List of boids in the flock
         self.boidList = [
@@ -238,12 +297,20 @@ class PolyFileConfiguration(Configuration):
                 Configuration.ySize,
                 Configuration.numNeighbours,
                 boid.guassianFunc,
-                self.obstacleList,
+                self.boidObstacleList,
                 self.goalList,
                 self.prmGen,
                 Configuration.screen,
-                Configuration.colorList[i],
+                Configuration.colorList[i % len(Configuration.colorList)],
                 Configuration.boid_radius,
-                self.determinePositionInConfig(i, flockSize, startPoint)
+                self.determinePositionInConfig(i, flockSize, startPoint),
+                self.flockParams
             ) for i in range(flockSize)
         ]
+
+        ## BVH over the obstacles the boids check against
+        self.boidObstacleTree = self.obstacleTree
+        if self.boidObstacleList is not self.obstacleList:
+            self.boidObstacleTree = bvh.ObstacleTree(self.boidObstacleList)
+        for b in self.boidList:
+            b.obstacleTree = self.boidObstacleTree
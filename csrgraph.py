@@ -0,0 +1,141 @@
+__author__ = "amritansh"
+
+import array
+import heapq
+
+## Distance of nodes that can not be reached
+INF = float("inf")
+
+
+class CSRGraph:
+    """
+    Roadmap stored in compressed sparse row form. The neighbours of node
+    k are targets[offsets[k]:offsets[k + 1]] and the edge weights are the
+    same slice of weights. The three flat arrays take a fraction of the
+    memory of a dictionary of dictionaries and can be handed to other
+    processes as plain buffers. The graph is read only, it has to be
+    rebuilt when the roadmap changes
+    """
+    def __init__(self, _roadmap, _reverse=False):
+        """
+        Builds the graph from a roadmap
+        @param _roadmap The roadmap, maps a node index to a dictionary of
+        its neighbours and edge weights
+        @param _reverse Defines if the edges are reversed, so the
+        neighbours of a node are the nodes with an edge leading to it
+        """
+        edges = [
+            (p, k, w) if _reverse else (k, p, w)
+            for k in _roadmap.keys()
+            for p, w in _roadmap[k].items()
+        ]
+
+        ## The number of nodes, node indexes go from 0 to size - 1
+        self.size = 1 + max(
+            [-1] + _roadmap.keys() + [p for _, p, _ in edges]
+        )
+
+        counts = [0] * (self.size + 1)
+        for k, _, _ in edges:
+            counts[k + 1] += 1
+        for k in range(self.size):
+            counts[k + 1] += counts[k]
+
+        ## Index of the first edge of every node (and one past the last)
+        self.offsets = array.array("l", counts)
+
+        ## Node that every edge leads to
+        self.targets = array.array("l", [0] * len(edges))
+
+        ## Weight of every edge
+        self.weights = array.array("d", [0.0] * len(edges))
+
+        # edges keep the order of the roadmap dictionaries so searches
+        # settle ties the same way as dijkstra.Dijkstra
+        fill = counts[:-1]
+        for k, p, w in edges:
+            self.targets[fill[k]] = p
+            self.weights[fill[k]] = w
+            fill[k] += 1
+
+        ## Defines which nodes are in the roadmap (as a dictionary key,
+        ## or in any edge when the graph is reversed)
+        self.rows = bytearray(self.size)
+        for k in _roadmap.keys():
+            self.rows[k] = 1
+        if _reverse:
+            for k, _, _ in edges:
+                self.rows[k] = 1
+
+    def __contains__(self, node):
+        return 0 <= node < self.size
+
+    def get(self, node, default=()):
+        """
+        Gets the neighbours of a node
+        @param node The node index
+        @param default Returned when the node is not in the graph
+        @return The neighbour indexes
+        """
+        if node not in self:
+            return default
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+
+    def search(self, start, end=None, heuristic=None):
+        """
+        Finds shortest paths from the start node with Dijkstra's algorithm
+        (or A* when a heuristic is given) on a binary heap. Stale heap
+        entries are skipped when they are popped instead of being removed
+        @param start The starting node
+        @param end The search stops once this node is settled
+        @param heuristic Consistent lower bound of the distance from a node
+        to the end
+        @return The distances and the predecessors (-1 for none) of the
+        nodes
+        """
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        dist = array.array("d", [INF]) * self.size
+        pred = array.array("l", [-1]) * self.size
+        done = bytearray(self.size)
+
+        dist[start] = 0
+        heap = [(heuristic(start) if heuristic else 0, start)]
+        while heap:
+            _, v = heapq.heappop(heap)
+            if done[v]:
+                continue
+            done[v] = 1
+            if v == end:
+                break
+            dv = dist[v]
+            for e in xrange(offsets[v], offsets[v + 1]):
+                w = targets[e]
+                d = dv + weights[e]
+                if not done[w] and d < dist[w]:
+                    dist[w] = d
+                    pred[w] = v
+                    heapq.heappush(
+                        heap,
+                        (d + heuristic(w) if heuristic else d, w)
+                    )
+        return dist, pred
+
+    def shortestPath(self, start, end, heuristic=None):
+        """
+        Finds a single shortest path, with the same conventions as
+        dijkstra.shortestPath
+        @param start The starting node
+        @param end The ending node
+        @param heuristic Consistent lower bound of the distance from a node
+        to the end
+        @return A list of the nodes that lie on the shortest path
+        """
+        if start not in self or not self.rows[start]:
+            return []
+        dist, pred = self.search(start, end, heuristic)
+        path = [end]
+        while end != start and end in self and pred[end] != -1:
+            end = pred[end]
+            path.append(end)
+        path.reverse()
+        return path
@@ -37,7 +37,46 @@ def Dijkstra(G,start,end=None):
 
     return (D,P)
 
-def shortestPath(G,start,end):
+def AStar(G,start,end,heuristic):
+    """
+    Find shortest paths from the start vertex like Dijkstra(), but
+    vertices are expanded in order of their distance plus an estimate
+    of the remaining distance to the end, so the search heads towards
+    the end and stops after expanding far fewer vertices.
+
+
+    @param G The graph dictionary to be searched
+    @param start Starting node
+    @param end End node
+    @param heuristic Function that gives a lower bound of the distance
+    from a vertex to the end. It has to be consistent (never drop by
+    more than the weight of an edge) for the paths to be shortest
+    @return The final distances and the predecessors of the vertices
+    """
+
+    D = {}  # dictionary of final distances
+    P = {}  # dictionary of predecessors
+    E = {}  # dictionary of distances of non-final vertices
+    Q = priorityDictionary()   # est.dist. plus heuristic of non-final vert.
+    E[start] = 0
+    Q[start] = heuristic(start)
+
+    for v in Q:
+        D[v] = E[v]
+        if v == end: break
+
+        for w in G[v]:
+            vwLength = D[v] + G[v][w]
+            if w in D:
+                continue
+            elif w not in E or vwLength < E[w]:
+                E[w] = vwLength
+                Q[w] = vwLength + heuristic(w)
+                P[w] = v
+
+    return (D,P)
+
+def shortestPath(G,start,end,heuristic=None):
     """
     Find a single shortest path from the given start vertex
     to the given end vertex.
@@ -47,11 +86,16 @@ def shortestPath(G,start,end):
     @param G The graph dictionary to be searched
     @param start The starting node
     @param end The ending node
+    @param heuristic Lower bound of the distance from a vertex to the
+    end, the search is done with AStar() when it is given
     @return A list of the nodes that lie on the shortest path
     from start to end in G
     """
     try:
-        D,P = Dijkstra(G,start,end)
+        if heuristic is None:
+            D,P = Dijkstra(G,start,end)
+        else:
+            D,P = AStar(G,start,end,heuristic)
     except KeyError:
         return []
     Path = []
@@ -0,0 +1,181 @@
+__author__ = "amritansh"
+
+import numpy
+
+import geometry
+
+
+class DistanceField:
+    """
+    Rasterized signed distance field of the static obstacles. The distance
+    to the closest obstacle exterior and the obstacle edge it lies on are
+    computed once for every node of a regular grid. Distances are looked
+    up with bilinear interpolation. Closest points are not interpolated,
+    near the medial axis the corners of a cell can be closest to different
+    edges, so the query point is projected exactly onto the edges of the
+    four corners instead. A query costs the same no matter how many
+    obstacles the map has. Distances are negative inside of obstacles.
+
+    The field behaves like a single obstacle (getPoint, getRadius and
+    pointAllowed) so it can stand in for all of the static obstacles in
+    the obstacle list of a boid.
+    """
+    def __init__(
+        self,
+        _obstacleList,
+        _xSize,
+        _ySize,
+        _resolution=2,
+        _margin=100
+    ):
+        """
+        Builds the distance field of the obstacles
+        @param _obstacleList The list of static obstacles
+        @param _xSize The size of the x component of the world
+        @param _ySize The size of the y component of the world
+        @param _resolution The distance between two grid nodes
+        @param _margin How far the grid reaches outside of the world
+        """
+
+        ## Defines wether the obstacle is dynamic or not
+        self.dynamic = False
+
+        ## The distance between two grid nodes
+        self.resolution = float(_resolution)
+
+        ## Position of the first grid node
+        self.origin = (-_margin, -_margin)
+
+        xs = numpy.arange(-_margin, _xSize + _margin + _resolution, _resolution)
+        ys = numpy.arange(-_margin, _ySize + _margin + _resolution, _resolution)
+
+        ## The number of grid nodes along each axis
+        self.shape = len(ys), len(xs)
+
+        gx, gy = numpy.meshgrid(xs, ys)
+        nodes = numpy.column_stack((gx.ravel(), gy.ravel())).astype(float)
+
+        ## Edges of the obstacles packed together
+        self.edges = geometry.EdgeBuffer(
+            [ob.nodes for ob in _obstacleList],
+            4096
+        )
+
+        dist = numpy.full(len(nodes), numpy.inf)
+        edge = numpy.zeros(len(nodes), dtype=int)
+        inside = numpy.zeros(len(nodes), dtype=bool)
+        for k, ob in enumerate(_obstacleList):
+            # the distance to the bounding box is a lower bound, so only
+            # the nodes that could get closer are checked exactly
+            lo = numpy.min(ob.nodes, axis=0)
+            hi = numpy.max(ob.nodes, axis=0)
+            gap = numpy.maximum(numpy.maximum(lo - nodes, nodes - hi), 0)
+            boxDist = numpy.sqrt((gap ** 2).sum(axis=1))
+            check = numpy.nonzero(boxDist < dist)[0]
+            _, d, e = self.edges.closestPoints(nodes[check], polygon=k)
+            closer = d < dist[check]
+            dist[check[closer]] = d[closer]
+            edge[check[closer]] = e[closer]
+
+            inBox = numpy.nonzero(boxDist == 0)[0]
+            inside[inBox] |= self.edges.pointsInPolygons(
+                nodes[inBox],
+                polygon=k
+            )
+
+        ## Signed distance to the closest obstacle exterior at every node
+        self.distance = numpy.where(inside, -dist, dist).reshape(self.shape)
+
+        ## Index (in edges) of the closest obstacle edge of every node
+        self.edge = edge.reshape(self.shape)
+
+    def cellWeights(self, points):
+        """
+        Gets the grid cell and the bilinear weights of many points
+        @param points Array (M, 2) of query points
+        @return The row and column of the cell corner and the fractional
+        offsets inside of the cell
+        """
+        points = numpy.asarray(points, dtype=float)
+        u = (points[:, 0] - self.origin[0]) / self.resolution
+        v = (points[:, 1] - self.origin[1]) / self.resolution
+        u = numpy.clip(u, 0, self.shape[1] - 1.000001)
+        v = numpy.clip(v, 0, self.shape[0] - 1.000001)
+        col = u.astype(int)
+        row = v.astype(int)
+        return row, col, u - col, v - row
+
+    def bilinear(self, grid, row, col, fu, fv):
+        """
+        Interpolates a grid at the given cells
+        @param grid The grid to be interpolated
+        @param row, col The cell corners returned by cellWeights
+        @param fu, fv The fractional offsets returned by cellWeights
+        @return The interpolated values
+        """
+        return (
+            grid[row, col] * (1 - fu) * (1 - fv) +
+            grid[row, col + 1] * fu * (1 - fv) +
+            grid[row + 1, col] * (1 - fu) * fv +
+            grid[row + 1, col + 1] * fu * fv
+        )
+
+    def sample(self, points):
+        """
+        Looks up the signed distance and the closest obstacle point of
+        many points at once
+        @param points Array (M, 2) of query points
+        @return An array (M, 2) of closest points and an array (M,) of
+        signed distances
+        """
+        points = numpy.asarray(points, dtype=float).reshape(-1, 2)
+        row, col, fu, fv = self.cellWeights(points)
+        edges = numpy.column_stack((
+            self.edge[row, col],
+            self.edge[row, col + 1],
+            self.edge[row + 1, col],
+            self.edge[row + 1, col + 1]
+        ))
+        cp, d = geometry.segmentPoints(
+            points[:, None, :],
+            self.edges.start[edges],
+            self.edges.end[edges]
+        )
+        k = d.argmin(axis=1)
+        return (
+            cp[numpy.arange(len(points)), k],
+            self.bilinear(self.distance, row, col, fu, fv)
+        )
+
+    def getDistance(self, p):
+        """
+        Gets the signed distance from p to the closest obstacle exterior
+        @param p The point to be checked
+        @return The distance, negative if p is inside of an obstacle
+        """
+        return float(self.sample([p])[1][0])
+
+    def getPoint(self, p):
+        """
+        Gets the closest point on the exterior of the static obstacles to p
+        @param p The point to be checked
+        @return The closest point that lies on an obstacle exterior
+        """
+        return tuple(self.sample([p])[0][0])
+
+    def getRadius(self):
+        """
+        Gets the 'radius' of the checking point. Matches
+        PolyObstacle.getRadius
+        @return 1
+        """
+        return 1
+
+    def pointAllowed(self, b, p):
+        """
+        Checks if a point is allowed, meaning no collisions occur
+        @param b The boid object that will be checked
+        @param p The point that will be checked
+        @return True if allowed, false otherwise
+        """
+        return self.getDistance(p) > b.radius
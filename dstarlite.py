@@ -0,0 +1,218 @@
+__author__ = "amritansh"
+
+import heapq
+
+## Distance of nodes that can not reach the goal
+INF = float("inf")
+
+
+def zeroHeuristic(p, q):
+    """
+    Heuristic that gives no information about the distance between nodes
+    @param p The first node
+    @param q The second node
+    @return 0
+    """
+    return 0
+
+
+class DStarLite:
+    """
+    Incremental shortest path search to a fixed goal node (D* Lite).
+    The search runs backwards from the goal and keeps its state between
+    queries, so when edge weights change or the start node moves only the
+    part of the search that is affected is repaired.
+
+    The state can be seeded with the distances of an existing shortest
+    path tree of the same graph. Only the nodes whose distance changed
+    are stored, the rest are read from the seed.
+    """
+    def __init__(
+        self,
+        _graph,
+        _goal,
+        _predecessors,
+        _seed=None,
+        _heuristic=zeroHeuristic
+    ):
+        """
+        Creates the search
+        @param _graph The graph, maps a node to a dictionary of its
+        neighbours and edge weights. Weights can change and edges can be
+        removed between queries, but no edges can be added
+        @param _goal The node that the paths lead to
+        @param _predecessors Maps a node to the nodes that have (or had)
+        an edge leading to it
+        @param _seed Shortest path distances to the goal that are correct
+        for the current weights (nothing is known when None)
+        @param _heuristic Consistent estimate of the distance between two
+        nodes
+        """
+
+        ## The graph that is searched
+        self.graph = _graph
+
+        ## The node that the paths lead to
+        self.goal = _goal
+
+        ## Maps a node to the nodes that have an edge leading to it
+        self.predecessors = _predecessors
+
+        ## Distances that the search starts from
+        self.seed = _seed if _seed is not None else {_goal: 0}
+
+        ## Estimate of the distance between two nodes
+        self.heuristic = _heuristic
+
+        ## Distances that differ from the seed
+        self.g = dict()
+
+        ## One step lookahead distances that differ from the seed
+        self.rhs = dict()
+
+        ## Heap of (key, node) pairs, entries are stale when the key
+        ## does not match the one in queued
+        self.heap = list()
+
+        ## Current key of every node in the queue
+        self.queued = dict()
+
+        ## Accumulated heuristic offset from the start moving
+        self.km = 0
+
+        ## The start node of the previous query
+        self.last = None
+
+    def getG(self, s):
+        return self.g[s] if s in self.g else self.seed.get(s, INF)
+
+    def getRHS(self, s):
+        return self.rhs[s] if s in self.rhs else self.seed.get(s, INF)
+
+    def calculateKey(self, start, s):
+        """
+        Gets the priority of a node
+        @param start The start node of the query (None before the first
+        query, the key is then too small and fixed when it is popped)
+        @param s The node
+        @return The key of the node
+        """
+        m = min(self.getG(s), self.getRHS(s))
+        if start is None:
+            return (m + self.km, m)
+        return (m + self.heuristic(start, s) + self.km, m)
+
+    def lookahead(self, u):
+        """
+        Recomputes the one step lookahead distance of a node from all of
+        its neighbours
+        @param u The node
+        """
+        if u != self.goal:
+            g, seed = self.g, self.seed
+            best = INF
+            for v, w in self.graph[u].iteritems():
+                # self loops can never shorten a path
+                if v != u:
+                    d = w + (g[v] if v in g else seed.get(v, INF))
+                    if d < best:
+                        best = d
+            self.rhs[u] = best
+
+    def updateVertex(self, start, u):
+        """
+        Queues a node if it is inconsistent
+        @param start The start node of the query
+        @param u The node
+        """
+        self.queued.pop(u, None)
+        if self.getG(u) != self.getRHS(u):
+            key = self.calculateKey(start, u)
+            self.queued[u] = key
+            heapq.heappush(self.heap, (key, u))
+
+    def edgesChanged(self, u):
+        """
+        Tells the search that the weights of the edges leaving a node
+        changed
+        @param u The node
+        """
+        self.lookahead(u)
+        self.updateVertex(self.last, u)
+
+    def topKey(self):
+        """
+        Gets the smallest key in the queue, dropping stale entries
+        @return The key, or (INF, INF) if the queue is empty
+        """
+        while self.heap:
+            key, u = self.heap[0]
+            if self.queued.get(u) == key:
+                return key
+            heapq.heappop(self.heap)
+        return (INF, INF)
+
+    def computeShortestPath(self, start):
+        """
+        Repairs the search until the distance of the start node is known
+        @param start The start node of the query
+        """
+        if self.last is not None and self.last != start:
+            self.km += self.heuristic(self.last, start)
+        self.last = start
+
+        while (
+            self.topKey() < self.calculateKey(start, start) or
+            self.getRHS(start) > self.getG(start)
+        ):
+            kOld, u = heapq.heappop(self.heap)
+            kNew = self.calculateKey(start, u)
+            if kOld < kNew:
+                self.queued[u] = kNew
+                heapq.heappush(self.heap, (kNew, u))
+                continue
+            del self.queued[u]
+            # the queue of a predecessor only changes when its lookahead
+            # distance does
+            if self.getG(u) > self.getRHS(u):
+                gNew = self.g[u] = self.getRHS(u)
+                for p in self.predecessors.get(u, ()):
+                    if p != u and p != self.goal:
+                        # the edge can have been removed since
+                        d = self.graph[p].get(u, INF) + gNew
+                        if d < self.getRHS(p):
+                            self.rhs[p] = d
+                            self.updateVertex(start, p)
+            else:
+                gOld = self.getG(u)
+                self.g[u] = INF
+                for p in self.predecessors.get(u, ()):
+                    # only the nodes that went through u have to look
+                    # for a new best neighbour
+                    w = self.graph[p].get(u)
+                    if p != u and w is not None and self.getRHS(p) == w + gOld:
+                        self.lookahead(p)
+                        self.updateVertex(start, p)
+                self.lookahead(u)
+                self.updateVertex(start, u)
+
+    def getPath(self, start):
+        """
+        Finds the shortest path from a node to the goal
+        @param start The start node
+        @return A list of the nodes on the path, an empty list if the goal
+        can not be reached
+        """
+        self.computeShortestPath(start)
+        # the search can stop with the start node overconsistent, so its
+        # lookahead distance is the one that is known to be correct
+        if self.getRHS(start) == INF:
+            return []
+        path = [start]
+        while path[-1] != self.goal and len(path) <= len(self.graph):
+            u = path[-1]
+            path.append(min(
+                (w + self.getG(v), v) for v, w in self.graph[u].items()
+                if v != u
+            )[1])
+        return path
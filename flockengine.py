@@ -0,0 +1,562 @@
+__author__ = "amritansh"
+
+import numpy
+
+import distancefield
+import geometry
+
+
+def findMaxIndexes(score, k):
+    """
+    Batched version of Boid.findMax. Picks the k highest scores of every
+    row with a partial sort instead of k passes over the row. Ties go to
+    the lowest index and, as in findMax, once only zero scores are left
+    the remaining picks are index 0
+    @param score Array (M, N) of non negative scores
+    @param k The number of indexes to pick from every row
+    @return An (M, k) array of column indexes in the order findMax picks them
+    """
+    m, n = score.shape
+    rows = numpy.arange(m)
+    kk = min(k, n)
+    part = numpy.argpartition(-score, kk - 1, axis=1)[:, :kk]
+    kth = score[rows[:, None], part].min(axis=1)[:, None]
+
+    # everything above the k-th score plus the lowest indexes that tie it
+    greater = score > kth
+    tied = (score == kth) & (kth > 0)
+    need = kk - greater.sum(axis=1)
+    tied &= numpy.cumsum(tied, axis=1) <= need[:, None]
+    chosenRows, chosenCols = numpy.nonzero(greater | tied)
+
+    counts = numpy.bincount(chosenRows, minlength=m)
+    slot = numpy.arange(len(chosenCols)) - numpy.repeat(
+        numpy.cumsum(counts) - counts,
+        counts
+    )
+    picked = numpy.zeros((m, k), dtype=int)
+    values = numpy.full((m, k), -1.0)
+    picked[chosenRows, slot] = chosenCols
+    values[chosenRows, slot] = score[chosenRows, chosenCols]
+    order = numpy.argsort(-values, axis=1, kind="mergesort")
+    return picked[rows[:, None], order]
+
+
+def selectNeighbors(
+    position, stuck, goalKey, flockGoalKey,
+    k, dAvg, dSigma, lo=0, hi=None, chunkSize=512
+):
+    """
+    Picks the neighbours of every boid in the flock in one batched pass.
+    Mirrors Boid.getNeighborVectorList: every boid scores the flock with
+    the gaussian distance function, boids that are stuck or share its goal
+    score 0, and the k best scores are picked. The score matrix is built
+    in blocks of rows so large flocks do not need an N x N matrix
+    @param position Array (N, 2) of boid positions
+    @param stuck Boolean array (N,) of the boids that are stuck
+    @param goalKey Integer array (N,) identifying the goal of every boid
+    @param flockGoalKey Goal keys of the flock as seen by the other boids
+    @param k The number of neighbours of every boid
+    @param dAvg, dSigma Arrays (N,) with the gaussian parameters of every boid
+    @param lo, hi Only the boids lo to hi - 1 pick neighbours (all by default)
+    @param chunkSize The number of rows of the score matrix built at once
+    @return An (hi - lo, k) array of neighbour indexes
+    """
+    if hi is None:
+        hi = len(position)
+    nIndexes = numpy.zeros((hi - lo, k), dtype=int)
+    for start in range(lo, hi, chunkSize):
+        end = min(start + chunkSize, hi)
+        dist = numpy.sqrt((
+            (position[start:end, None, :] - position[None, :, :]) ** 2
+        ).sum(axis=2))
+        sigma = dSigma[start:end, None]
+        score = numpy.exp(
+            -0.5 * ((dist - dAvg[start:end, None]) / sigma) ** 2
+        ) / (2.5066282746310002 * sigma)
+        score[:, stuck] = 0
+        score[goalKey[start:end, None] == flockGoalKey[None, :]] = 0
+        nIndexes[start - lo:end - lo] = findMaxIndexes(score, k)
+    return nIndexes
+
+
+class FlockEngine:
+    """
+    Struct-of-arrays engine that steps the whole flock at once. The
+    positions, headings, goals, stuck flags and function parameters of
+    every boid are kept in NumPy arrays, and the potential fields used by
+    Boid.update are evaluated for all boids with batched array operations.
+    The polygon obstacles are checked in the approximate mode of the edge
+    buffer, so the closest points and collisions match the ones of
+    PolyObstacle.getPoint and pointInPoly. The results are written back
+    to the Boid objects after every step so that drawing and statistics
+    keep working on the boid list.
+
+    The engine always steps synchronously: every boid reads the state of
+    the flock from the start of the frame and the new positions and
+    headings are written into separate buffers that are swapped at the end
+    of the step. A step is split into prepare (goal bookkeeping on the
+    Boid objects), computeShard (the potential fields for a range of
+    boids) and finish (stuck detection and write back). All arrays are
+    updated in place so subclasses can keep them in shared memory.
+    """
+    def __init__(self, _boidList, _obstacleList):
+        """
+        Creates an instance of the FlockEngine from an initialized flock
+        @param _boidList The list of boids in the flock
+        @param _obstacleList The list of obstacles (static and dynamic)
+        """
+
+        ## The list of boids the engine steps
+        self.boidList = _boidList
+
+        ## List of obstacles that were parsed by mapparser
+        self.obstacleList = _obstacleList
+
+        ## Number of neighbours that will influence the boids
+        self.neighborSize = _boidList[0].neighborSize
+
+        ## Length of the position buffer used to tell if a boid is stuck
+        self.bufferLength = len(_boidList[0].positionBuffer)
+
+        ## Maps goal positions to integer keys so goals can be compared
+        ## as arrays
+        self.goalKeys = dict()
+
+        ## Indexes (in the obstacle list) of the distance fields
+        self.fieldIndexes = [
+            k for k, ob in enumerate(_obstacleList)
+            if isinstance(ob, distancefield.DistanceField)
+        ]
+
+        ## Indexes (in the obstacle list) of the polygon obstacles
+        self.polygonIndexes = [
+            k for k in range(len(_obstacleList))
+            if k not in self.fieldIndexes
+        ]
+
+        ## Edges of every polygon obstacle packed together
+        self.edges = geometry.EdgeBuffer(
+            [_obstacleList[k].nodes for k in self.polygonIndexes]
+        )
+
+        n = len(_boidList)
+        self.position = self.gather("position")
+        self.heading = self.gather("heading")
+
+        ## Frame t + 1 buffers, swapped with position and heading at the
+        ## end of every step
+        self.nextPosition = self.allocate((n, 2))
+        self.nextHeading = self.allocate((n, 2))
+
+        self.stuck = self.gather("stuck", bool)
+        self.superStuck = self.gather("super_stuck", bool)
+        self.done = self.gather("DONE", bool)
+        self.stuckCounter = self.gather("stuck_counter", int)
+
+        self.radius = self.gather("radius")
+        self.speed = self.gather("speed")
+        self.obInfluenceR = self.gather("obInfluenceR")
+        self.bInfluenceR = self.gather("bInfluenceR")
+        self.obBeta = self.gather("obBeta")
+        self.gAlpha = self.gather("gAlpha")
+        self.gBeta = self.gather("gBeta")
+        self.gDelta = self.gather("gDelta")
+        self.gConst = self.gather("gConst")
+        self.bAlpha = self.gather("bAlpha")
+        self.bBeta = self.gather("bBeta")
+        self.bDelta = self.gather("bDelta")
+        self.bConst = self.gather("bConst")
+        self.stuckConst = self.gather("stuckConst")
+        self.nStuckDAvg = self.gather("nStuckDAvg")
+        self.nStuckDSigma = self.gather("nStuckDSigma")
+        self.headWeight = self.gather("headWeightList")
+
+        self.goalCounter = self.allocate(n, int)
+        self.goalCount = self.allocate(n, int)
+        self.goalPosition = self.allocate((n, 2))
+        self.goalRadius = self.allocate(n)
+        self.goalKey = self.allocate(n, int)
+        for i in range(n):
+            self.pullGoal(i)
+
+        ## Goal keys of the flock at the start of the frame
+        self.frameGoalKey = self.allocate(n, int)
+
+        ## Boids that were not at their last goal at the start of the frame
+        self.active = self.allocate(n, bool)
+
+        ## Ring buffer of past positions, the oldest entry of every boid
+        ## is stored at index bufferHead
+        self.positionBuffer = numpy.zeros((n, self.bufferLength, 2))
+        self.bufferHead = 0
+        for i, b in enumerate(_boidList):
+            self.positionBuffer[i] = numpy.roll(
+                numpy.array(b.positionBuffer, dtype=float),
+                self.bufferHead,
+                axis=0
+            )
+
+    def allocate(self, shape, dtype=float):
+        """
+        Allocates a zeroed state array
+        @param shape The shape of the array
+        @param dtype The type of the array
+        @return The new array
+        """
+        return numpy.zeros(shape, dtype=dtype)
+
+    def gather(self, attr, dtype=float):
+        """
+        Gathers an attribute of every boid into an array
+        @param attr The name of the boid attribute
+        @param dtype The type of the array
+        @return An array holding the attribute of every boid
+        """
+        values = numpy.array(
+            [getattr(b, attr) for b in self.boidList],
+            dtype=dtype
+        )
+        array = self.allocate(values.shape, dtype)
+        array[...] = values
+        return array
+
+    def getGoalKey(self, position):
+        """
+        Gets the integer key of a goal position
+        @param position The position of the goal
+        @return An integer that is unique to the goal position
+        """
+        return self.goalKeys.setdefault(tuple(position), len(self.goalKeys))
+
+    def pullGoal(self, i):
+        """
+        Reads the goal state of a boid back into the arrays after the boid
+        changed its goal
+        @param i The index of the boid in the boid list
+        """
+        b = self.boidList[i]
+        self.goalCounter[i] = b.goalCounter
+        self.goalCount[i] = len(b.goalList)
+        self.goalPosition[i] = b.goal.position
+        self.goalRadius[i] = b.goal.radius
+        self.goalKey[i] = self.getGoalKey(b.goal.position)
+        self.gConst[i] = b.gConst
+
+    def resetPositionBuffer(self, i):
+        """
+        Resets the position buffer of a boid (used after replanning)
+        @param i The index of the boid in the boid list
+        """
+        self.positionBuffer[i] = numpy.roll(
+            5.0 * numpy.arange(self.bufferLength)[:, None].repeat(2, axis=1),
+            self.bufferHead,
+            axis=0
+        )
+
+    def replan(self):
+        """
+        Finds new paths for the boids that are stuck
+        """
+        for i in numpy.nonzero(self.stuck & ~self.done)[0]:
+            b = self.boidList[i]
+            b.position = tuple(self.position[i])
+            b.determineNewPath()
+            self.pullGoal(i)
+            self.resetPositionBuffer(i)
+
+    def advanceGoals(self):
+        """
+        Moves the active boids that have reached their current goal on
+        to the next goal
+        """
+        reached = self.active & numpy.all(
+            numpy.abs(self.position - self.goalPosition) <
+            self.goalRadius[:, None],
+            axis=1
+        )
+        for i in numpy.nonzero(reached)[0]:
+            b = self.boidList[i]
+            b.position = tuple(self.position[i])
+            b.gConst = self.gConst[i]
+            b.setNewGoal()
+            self.pullGoal(i)
+
+    def refreshEdges(self):
+        """
+        Copies the current vertices of the dynamic obstacles into the
+        edge buffer
+        """
+        for k, index in enumerate(self.polygonIndexes):
+            if getattr(self.obstacleList[index], "dynamic", False):
+                self.edges.update(k, self.obstacleList[index].nodes)
+
+    def obstacleProximity(self, points):
+        """
+        Gets the closest point of every obstacle to every point
+        @param points Array (M, 2) of query points
+        @return Arrays (M, O, 2) of closest points and (M, O) of distances
+        """
+        m, o = len(points), len(self.obstacleList)
+        cp = numpy.zeros((m, o, 2))
+        dist = numpy.full((m, o), numpy.inf)
+        if self.polygonIndexes:
+            cols = self.polygonIndexes
+            cp[:, cols], dist[:, cols] = \
+                self.edges.closestPointsPerPolygon(points, True)
+        for k in self.fieldIndexes:
+            cp[:, k], dist[:, k] = self.obstacleList[k].sample(points)
+            dist[:, k] = numpy.abs(dist[:, k])
+        return cp, dist
+
+    def pointsAllowed(self, points, radius):
+        """
+        Checks which points are inside of the world and do not collide
+        with any of the obstacles
+        @param points Array (M, 2) holding the new positions of the boids
+        @param radius Array (M,) holding the radii of the boids
+        @return A boolean array that is True for the allowed points
+        """
+        b0 = self.boidList[0]
+        allowed = (
+            (points[:, 0] > -100) & (points[:, 0] < b0.xSize + 100) &
+            (points[:, 1] > -100) & (points[:, 1] < b0.ySize + 100)
+        )
+        for k in self.fieldIndexes:
+            allowed &= self.obstacleList[k].sample(points)[1] > radius
+        if self.polygonIndexes:
+            cp, dist = self.edges.closestPointsPerPolygon(points, True)
+            allowed &= (dist > radius[:, None]).all(axis=1)
+            allowed &= ~self.edges.pointsInPolygons(points, True).any(axis=1)
+        return allowed
+
+    def sigmoid(self, alpha, beta, delta, const, rProduct, dist):
+        """
+        Batched version of Boid.sigmoidFunc
+        @param alpha, beta, delta, const Constants that are used to modify the shape of the curve
+        @param rProduct The product of the two radii
+        @param dist The distance between the two objects
+        """
+        return rProduct * alpha / (1 + beta * numpy.exp(delta * dist)) + const
+
+    def goalVectors(self, rows, enabled):
+        """
+        Batched version of Boid.getGoalVector
+        @param rows The slice of boids to compute
+        @param enabled Boolean array of the boids that are attracted to the goal
+        @return The average goal vectors and the goal magnitudes
+        """
+        diff = self.goalPosition[rows] - self.position[rows]
+        dist = numpy.sqrt((diff ** 2).sum(axis=1))
+        magnitude = self.sigmoid(
+            self.gAlpha[rows], self.gBeta[rows], self.gDelta[rows],
+            self.gConst[rows], self.radius[rows] * self.goalRadius[rows],
+            dist
+        )
+        safeDist = numpy.where(dist > 0, dist, 1.0)
+        vector = diff * (self.speed[rows] / safeDist)[:, None]
+        vector[dist == 0] = 0
+        return (
+            numpy.where(enabled[:, None], vector, 0.0),
+            numpy.where(enabled, magnitude, 1.0)
+        )
+
+    def obstacleVectors(self, rows, cp, dist):
+        """
+        Batched version of Boid.getObstacleVectorList
+        @param rows The slice of boids to compute
+        @param cp, dist The closest obstacle points and their distances
+        @return The weighted obstacle vectors and the obstacle magnitudes
+        """
+        radius = self.radius[rows]
+        influence = (
+            (dist < self.obInfluenceR[rows][:, None]) &
+            self.active[rows][:, None]
+        )
+        beta = numpy.where(
+            self.stuck[rows],
+            self.obBeta[rows] / 10,
+            self.obBeta[rows]
+        )
+        gap = numpy.sqrt(numpy.abs(dist - 1 - radius[:, None]))
+        magnitude = numpy.where(
+            influence,
+            (radius * beta)[:, None] / numpy.maximum(gap, 1e-9),
+            0.0
+        )
+        diff = self.position[rows][:, None, :] - cp
+        safeDist = numpy.where(dist > 0, dist, 1.0)
+        vector = diff * (self.speed[rows][:, None] / safeDist)[:, :, None]
+        return (
+            (magnitude[:, :, None] * vector).sum(axis=1),
+            magnitude.sum(axis=1)
+        )
+
+    def boidVectors(self, rows):
+        """
+        Batched version of Boid.getBoidVectorList. Only the pairs of boids
+        that share or neighbour a cell of a uniform grid are checked
+        @param rows The slice of boids to compute
+        @return The weighted boid vectors and the boid magnitudes
+        """
+        i, j = geometry.neighborPairs(
+            self.position,
+            self.bInfluenceR.max(),
+            numpy.arange(rows.start, rows.stop)
+        )
+        diff = self.position[i] - self.position[j]
+        dist = numpy.sqrt((diff ** 2).sum(axis=1))
+        inGoal = numpy.all(
+            numpy.abs(self.position[j] - self.goalPosition[i]) <
+            self.goalRadius[i][:, None],
+            axis=1
+        )
+        influence = (dist < self.bInfluenceR[i]) & (dist > 0) & ~inGoal
+        i, diff, dist = i[influence], diff[influence], dist[influence]
+
+        magnitude = self.sigmoid(
+            self.bAlpha[i], self.bBeta[i], self.bDelta[i], self.bConst[i],
+            self.radius[i] ** 2, dist
+        )
+        weight = magnitude * self.speed[i] / dist
+        i = i - rows.start
+        n = rows.stop - rows.start
+        return (
+            numpy.column_stack((
+                numpy.bincount(i, weight * diff[:, 0], minlength=n),
+                numpy.bincount(i, weight * diff[:, 1], minlength=n)
+            )),
+            numpy.bincount(i, magnitude, minlength=n)
+        )
+
+    def prepare(self):
+        """
+        Replans the stuck boids and advances the goals of the boids that
+        reached them. Runs on the Boid objects, before the shards
+        """
+        # the rest of the flock is seen with the goals it had at the
+        # start of the frame
+        self.frameGoalKey[:] = self.goalKey
+        self.replan()
+
+        self.active[:] = self.goalCounter < self.goalCount - 1
+        self.advanceGoals()
+        self.done |= ~self.active
+        self.bConst[~self.active] = 100
+
+    def computeShard(self, lo, hi):
+        """
+        Computes the new heading and position of the boids lo to hi - 1
+        from the frame t state and writes them into the frame t + 1 buffers
+        @param lo The index of the first boid
+        @param hi One past the index of the last boid
+        """
+        self.refreshEdges()
+        rows = slice(lo, hi)
+        position = self.position[rows]
+        active = self.active[rows]
+
+        cp, obDist = self.obstacleProximity(position)
+        tooClose = (obDist < 20).any(axis=1)
+
+        goVecSum, gMagSum = self.goalVectors(
+            rows,
+            active & (self.stuck[rows] | ~tooClose)
+        )
+
+        nIndexes = selectNeighbors(
+            self.position, self.stuck, self.goalKey, self.frameGoalKey,
+            self.neighborSize, self.nStuckDAvg, self.nStuckDSigma, lo, hi
+        )
+        neVecSum = numpy.where(
+            active[:, None],
+            self.heading[nIndexes].sum(axis=1) / self.neighborSize,
+            0.0
+        )
+
+        obVecList, obMagSum = self.obstacleVectors(rows, cp, obDist)
+        obMagSum = numpy.where(active, obMagSum, 1.0)
+        safeObMag = numpy.where(obMagSum > 0, obMagSum, 1.0)
+        obVecSum = obVecList / safeObMag[:, None]
+
+        bVecList, bMagSum = self.boidVectors(rows)
+        safeBMag = numpy.where(bMagSum > 0, bMagSum, 1.0)
+        boVecSum = bVecList / safeBMag[:, None]
+
+        # weights the components in the same way as reduceWeightValues
+        nWeight = 10.0 * self.neighborSize
+        nHeading = (
+            nWeight * neVecSum +
+            bMagSum[:, None] * boVecSum +
+            gMagSum[:, None] * goVecSum +
+            obMagSum[:, None] * obVecSum
+        ) / (nWeight + bMagSum + gMagSum + obMagSum)[:, None]
+        headWeight = self.headWeight[rows]
+        self.nextHeading[rows] = (
+            headWeight[:, 0:1] * self.heading[rows] +
+            headWeight[:, 1:2] * nHeading
+        ) / headWeight.sum(axis=1)[:, None]
+
+        newPos = position + self.nextHeading[rows]
+        moved = self.pointsAllowed(newPos, self.radius[rows])
+        self.nextPosition[rows] = numpy.where(moved[:, None], newPos, position)
+
+    def swapBuffers(self):
+        """
+        Makes the frame t + 1 buffers the state read by the next step
+        """
+        self.position, self.nextPosition = self.nextPosition, self.position
+        self.heading, self.nextHeading = self.nextHeading, self.heading
+
+    def finish(self):
+        """
+        Swaps the buffers, updates the position buffers and stuck flags
+        and writes the new state back to the Boid objects
+        """
+        self.swapBuffers()
+
+        self.positionBuffer[:, self.bufferHead] = self.position
+        self.bufferHead = (self.bufferHead + 1) % self.bufferLength
+        movement = numpy.abs(
+            self.position - self.positionBuffer[:, self.bufferHead]
+        ).sum(axis=1)
+        self.stuck[:] = movement < self.stuckConst
+        self.stuckCounter += self.stuck & ~self.done
+        self.superStuck[:] = movement < self.stuckConst * 5
+
+        self.push()
+
+    def step(self):
+        """
+        Updates the heading and position of every boid in the flock due
+        to the potential fields
+        """
+        self.prepare()
+        self.computeShard(0, len(self.boidList))
+        self.finish()
+
+    def close(self):
+        """
+        Releases the resources held by the engine
+        """
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def push(self):
+        """
+        Writes the state of the arrays back to the Boid objects
+        """
+        for i, b in enumerate(self.boidList):
+            b.position = tuple(self.position[i])
+            b.heading = list(self.heading[i])
+            b.stuck = bool(self.stuck[i])
+            b.super_stuck = bool(self.superStuck[i])
+            b.DONE = bool(self.done[i])
+            b.stuck_counter = int(self.stuckCounter[i])
+            b.bConst = self.bConst[i]
+            b.gConst = self.gConst[i]
@@ -38,7 +38,8 @@ def generateStats(mapFile, iterations, startPoint, endPoint):
                             obstacle_file=None,
                             auto_gen_obst=True,
                             auto_gen_number=obstacles,
-                            data_file=dFile
+                            data_file=dFile,
+                            renderer="null"
                         )
                         fSim.render()
                         break
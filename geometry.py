@@ -0,0 +1,391 @@
+__author__ = "amritansh"
+
+import sys
+
+import numpy
+
+
+def polygonEdges(nodes):
+    """
+    Gets the edges of a polygon as arrays of endpoints. The edges are
+    walked in the same order as PolyObstacle.getPoint walks them
+    @param nodes The vertices of the polygon
+    @return Two arrays of shape (E, 2) holding the start and end point
+    of every edge
+    """
+    b = numpy.asarray(nodes, dtype=float)
+    a = numpy.roll(b, 1, axis=0)
+    return a, b
+
+
+def segmentPoints(points, a, b):
+    """
+    Gets the closest point on segments to points. The arrays broadcast
+    against each other, so every point can be checked against every
+    segment or against segments of its own
+    @param points Array (..., 2) of query points
+    @param a Array (..., 2) of the start points of the segments
+    @param b Array (..., 2) of the end points of the segments
+    @return Arrays (..., 2) of closest points and (...) of distances
+    """
+    ab = b - a
+    ap = points - a
+    atb2 = ab[..., 0] ** 2 + ab[..., 1] ** 2
+    dot = ap[..., 0] * ab[..., 0] + ap[..., 1] * ab[..., 1]
+    # degenerate segments are treated as their end point
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        t = numpy.clip(numpy.where(atb2 > 0, dot / atb2, 1.0), 0.0, 1.0)
+    cp = a + ab * t[..., None]
+    dist = numpy.sqrt(
+        (points[..., 0] - cp[..., 0]) ** 2 + (points[..., 1] - cp[..., 1]) ** 2
+    )
+    return cp, dist
+
+
+def neighborPairs(points, radius, queries=None):
+    """
+    Finds the pairs of points that might be within a radius of each other
+    by sorting the points into a uniform grid and only pairing points in
+    adjacent cells. The caller still has to check the exact distance
+    @param points Array of shape (N, 2) holding the points
+    @param radius The interaction radius, used as the cell size
+    @param queries Indexes of the points to find pairs for (all by default)
+    @return Two index arrays i, j (every ordered pair with i in queries,
+    including i == j)
+    """
+    points = numpy.asarray(points, dtype=float)
+    cells = numpy.floor(points / float(radius)).astype(numpy.int64)
+    cells -= cells.min(axis=0) - 1
+    width = cells[:, 1].max() + 2
+    keys = cells[:, 0] * width + cells[:, 1]
+    order = numpy.argsort(keys, kind="mergesort")
+    sortedKeys = keys[order]
+    if queries is None:
+        queries = numpy.arange(len(points))
+
+    iList, jList = list(), list()
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            target = keys[queries] + dx * width + dy
+            lo = numpy.searchsorted(sortedKeys, target, "left")
+            hi = numpy.searchsorted(sortedKeys, target, "right")
+            counts = hi - lo
+            total = counts.sum()
+            if total == 0:
+                continue
+            i = numpy.repeat(queries, counts)
+            offset = numpy.arange(total) - numpy.repeat(
+                numpy.cumsum(counts) - counts,
+                counts
+            )
+            iList.append(i)
+            jList.append(order[numpy.repeat(lo, counts) + offset])
+    if not iList:
+        empty = numpy.zeros(0, dtype=int)
+        return empty, empty
+    return numpy.concatenate(iList), numpy.concatenate(jList)
+
+
+class EdgeBuffer:
+    """
+    The edges of many polygons packed into contiguous arrays. The edges
+    of polygon k are start[offsets[k]:offsets[k + 1]] to end[...] and are
+    walked in the same order as PolyObstacle.getPoint walks them. Queries
+    take many points at once and check them against every edge in one
+    pass.
+
+    Queries can be exact (the closest point on the segment) or
+    approximate. The approximate queries reproduce PolyObstacle.getPoint
+    and PolyObstacle.pointInPoly (including their rounding), so they can
+    replace the per obstacle loops without changing any results.
+    """
+    def __init__(self, _polygons, _chunkSize=256):
+        """
+        Packs the edges of the polygons
+        @param _polygons List of vertex lists, one per polygon
+        @param _chunkSize Number of query points checked at once, bounds
+        the size of the (points, edges) temporaries
+        """
+        counts = [len(nodes) for nodes in _polygons]
+
+        ## Index of the first edge of every polygon (and one past the last)
+        self.offsets = numpy.concatenate(([0], numpy.cumsum(counts)))
+
+        ## Polygon that every edge belongs to
+        self.owner = numpy.repeat(numpy.arange(len(counts)), counts)
+
+        ## Start and end points of the edges
+        self.start = numpy.zeros((len(self.owner), 2))
+        self.end = numpy.zeros((len(self.owner), 2))
+        for k, nodes in enumerate(_polygons):
+            self.update(k, nodes)
+
+        ## Number of query points checked at once
+        self.chunkSize = _chunkSize
+
+    def update(self, k, nodes):
+        """
+        Replaces the edges of a polygon after it moved. The number of
+        vertices can not change
+        @param k The index of the polygon
+        @param nodes The new vertices of the polygon
+        """
+        rows = slice(self.offsets[k], self.offsets[k + 1])
+        self.start[rows], self.end[rows] = polygonEdges(nodes)
+
+    def chunks(self, points):
+        """
+        Splits the query points into chunks
+        @param points Array (M, 2) of query points
+        @return Generator of row slices
+        """
+        for lo in range(0, len(points), self.chunkSize):
+            yield slice(lo, min(lo + self.chunkSize, len(points)))
+
+    def edgeRows(self, polygon=None):
+        """
+        Gets the rows of the edges of a polygon
+        @param polygon The index of the polygon (every edge when None)
+        @return A slice of the edge arrays
+        """
+        if polygon is None:
+            return slice(0, len(self.owner))
+        return slice(self.offsets[polygon], self.offsets[polygon + 1])
+
+    def edgePoints(self, points, approximate=False, edges=slice(None)):
+        """
+        Gets the closest point on every edge to every query point
+        @param points Array (M, 2) of query points
+        @param approximate Defines if PolyObstacle.closestEdgePoint is
+        reproduced instead of the exact projection
+        @param edges The rows of the edges to be checked (all by default)
+        @return Arrays (M, E, 2) of closest points and (M, E) of distances
+        """
+        a, b = self.start[edges][None], self.end[edges][None]
+        p = points[:, None, :]
+        if not approximate:
+            return segmentPoints(p, a, b)
+        ab = b - a
+        ap = p - a
+        atb2 = ab[..., 0] ** 2 + ab[..., 1] ** 2
+        dot = ap[..., 0] * ab[..., 0] + ap[..., 1] * ab[..., 1]
+        # degenerate edges give nan projections, they are never picked
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            t = dot / atb2
+            lo = numpy.minimum(a, b)
+            hi = numpy.maximum(a, b)
+            outside = lambda r: (
+                ((r[..., 0] >= hi[..., 0]) | (r[..., 0] <= lo[..., 0])) &
+                ((r[..., 1] >= hi[..., 1]) | (r[..., 1] <= lo[..., 1]))
+            )
+            closer = lambda r: numpy.where(
+                (
+                    numpy.sqrt((a[..., 0] - r[..., 0]) ** 2 +
+                               (a[..., 1] - r[..., 1]) ** 2) <
+                    numpy.sqrt((b[..., 0] - r[..., 0]) ** 2 +
+                               (b[..., 1] - r[..., 1]) ** 2)
+                )[..., None],
+                a,
+                b
+            )
+            proj = a + ab * t[..., None]
+            cp = numpy.where(
+                outside(p)[..., None],
+                closer(p),
+                numpy.where(outside(proj)[..., None], closer(proj), proj)
+            )
+            dist = numpy.sqrt(
+                (p[..., 0] - cp[..., 0]) ** 2 + (p[..., 1] - cp[..., 1]) ** 2
+            )
+            return cp, dist
+
+    def closestPoints(self, points, approximate=False, polygon=None):
+        """
+        Gets the closest point on any of the polygons to every query point
+        @param points Array (M, 2) of query points
+        @param approximate Defines if PolyObstacle.getPoint is reproduced
+        @param polygon Only the edges of this polygon are checked (all of
+        the polygons by default)
+        @return Arrays (M, 2) of closest points, (M,) of distances and
+        (M,) of the edges they lie on (owner maps an edge to its polygon)
+        """
+        points = numpy.asarray(points, dtype=float).reshape(-1, 2)
+        edges = self.edgeRows(polygon)
+        cp = numpy.zeros((len(points), 2))
+        dist = numpy.full(len(points), numpy.inf)
+        edge = numpy.zeros(len(points), dtype=int)
+        if edges.start == edges.stop:
+            return cp, dist, edge
+        for rows in self.chunks(points):
+            edgeCp, edgeDist = self.edgePoints(
+                points[rows],
+                approximate,
+                edges
+            )
+            k = edgeDist.argmin(axis=1)
+            r = numpy.arange(len(k))
+            cp[rows], dist[rows], edge[rows] = (
+                edgeCp[r, k], edgeDist[r, k], edges.start + k
+            )
+        return cp, dist, edge
+
+    def closestPointsPerPolygon(self, points, approximate=False):
+        """
+        Gets the closest point of every polygon to every query point
+        @param points Array (M, 2) of query points
+        @param approximate Defines if PolyObstacle.getPoint is reproduced
+        @return Arrays (M, P, 2) of closest points and (M, P) of distances
+        """
+        points = numpy.asarray(points, dtype=float).reshape(-1, 2)
+        n = len(self.offsets) - 1
+        cp = numpy.zeros((len(points), n, 2))
+        dist = numpy.full((len(points), n), numpy.inf)
+        if n == 0:
+            return cp, dist
+        first = self.offsets[:-1]
+        edgeIndex = numpy.arange(len(self.owner))
+        for rows in self.chunks(points):
+            edgeCp, edgeDist = self.edgePoints(points[rows], approximate)
+            polyDist = numpy.minimum.reduceat(edgeDist, first, axis=1)
+            # the first edge with the smallest distance wins, as in getPoint
+            k = numpy.minimum.reduceat(
+                numpy.where(
+                    edgeDist == polyDist[:, self.owner],
+                    edgeIndex,
+                    len(edgeIndex)
+                ),
+                first,
+                axis=1
+            )
+            r = numpy.arange(len(k))[:, None]
+            cp[rows], dist[rows] = edgeCp[r, k], polyDist
+        return cp, dist
+
+    def pointsInPolygons(self, points, approximate=False, polygon=None):
+        """
+        Determines which polygons every query point is inside of
+        @param points Array (M, 2) of query points
+        @param approximate Defines if PolyObstacle.pointInPoly (and its
+        handling of vertices) is reproduced instead of the even-odd rule
+        @param polygon Only this polygon is checked (all of the polygons
+        by default)
+        @return A boolean array (M, P), or (M,) when polygon is given
+        """
+        points = numpy.asarray(points, dtype=float).reshape(-1, 2)
+        edges = self.edgeRows(polygon)
+        n = len(self.offsets) - 1
+        inside = numpy.zeros((len(points), n), dtype=bool)
+        if polygon is not None:
+            inside = numpy.zeros(len(points), dtype=bool)
+        if n == 0:
+            return inside
+        for rows in self.chunks(points):
+            p = points[rows]
+            if approximate:
+                crossings = self.rayCrossings(p, edges)
+            else:
+                a, b = self.start[edges][None], self.end[edges][None]
+                py = p[:, None, 1]
+                dy = b[..., 1] - a[..., 1]
+                with numpy.errstate(divide="ignore", invalid="ignore"):
+                    xCross = a[..., 0] + (py - a[..., 1]) * (
+                        (b[..., 0] - a[..., 0]) / dy
+                    )
+                    crossings = (
+                        ((a[..., 1] > py) != (b[..., 1] > py)) &
+                        (p[:, None, 0] < xCross)
+                    )
+            if polygon is not None:
+                inside[rows] = crossings.sum(axis=1) % 2 == 1
+                continue
+            inside[rows] = numpy.add.reduceat(
+                crossings.astype(int),
+                self.offsets[:-1],
+                axis=1
+            ) % 2 == 1
+        return inside
+
+    def segmentsCollide(self, starts, ends):
+        """
+        Reproduces PolyObstacle.detectCollision for many segments against
+        every polygon at once. An edge blocks a segment when the ends of
+        the segment are on opposite sides of the edge and the bounding
+        boxes of the two overlap
+        @param starts Array (M, 2) of the starting points of the segments
+        @param ends Array (M, 2) of the ending points of the segments
+        @return A boolean array (M,) that is True where a segment collides
+        with any of the polygons
+        """
+        starts = numpy.asarray(starts, dtype=float).reshape(-1, 2)
+        ends = numpy.asarray(ends, dtype=float).reshape(-1, 2)
+        hit = numpy.zeros(len(starts), dtype=bool)
+        if len(self.owner) == 0:
+            return hit
+
+        # detectCollision walks the closing edge of a polygon from its
+        # first vertex and the other edges from their start
+        closing = numpy.zeros(len(self.owner), dtype=bool)
+        first = self.offsets[:-1]
+        closing[first[first < self.offsets[1:]]] = True
+        anchor = numpy.where(closing[:, None], self.end, self.start)[None]
+        d = numpy.where(
+            closing[:, None],
+            self.end - self.start,
+            self.start - self.end
+        )[None]
+        lo = numpy.minimum(self.start, self.end)[None]
+        hi = numpy.maximum(self.start, self.end)[None]
+
+        side = lambda q: (
+            d[..., 0] * (q[..., 1] - anchor[..., 1]) -
+            d[..., 1] * (q[..., 0] - anchor[..., 0])
+        )
+        for rows in self.chunks(starts):
+            s = starts[rows][:, None, :]
+            e = ends[rows][:, None, :]
+            segLo = numpy.minimum(s, e)
+            segHi = numpy.maximum(s, e)
+            hit[rows] = (
+                (side(s) * side(e) < 0) &
+                (hi[..., 0] >= segLo[..., 0]) & (segHi[..., 0] >= lo[..., 0]) &
+                (hi[..., 1] >= segLo[..., 1]) & (segHi[..., 1] >= lo[..., 1])
+            ).any(axis=1)
+        return hit
+
+    def rayCrossings(self, points, edges=slice(None)):
+        """
+        Reproduces PolyObstacle.crossesEdge for every edge
+        @param points Array (M, 2) of query points
+        @param edges The rows of the edges to be checked (all by default)
+        @return A boolean array (M, E) that is True where a ray from the
+        point crosses the edge
+        """
+        start, end = self.start[edges], self.end[edges]
+        swap = (start[:, 1] > end[:, 1])[:, None]
+        a = numpy.where(swap, end, start)[None]
+        b = numpy.where(swap, start, end)[None]
+        px = points[:, None, 0]
+        py = points[:, None, 1]
+        py = numpy.where(
+            (py == a[..., 1]) | (py == b[..., 1]),
+            py + 0.00001,
+            py
+        )
+        miss = (
+            (py > b[..., 1]) | (py < a[..., 1]) |
+            (px > numpy.maximum(a[..., 0], b[..., 0]))
+        )
+        left = px < numpy.minimum(a[..., 0], b[..., 0])
+        tiny, huge = sys.float_info.min, sys.float_info.max
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            mRed = numpy.where(
+                numpy.abs(a[..., 0] - b[..., 0]) > tiny,
+                (b[..., 1] - a[..., 1]) / (b[..., 0] - a[..., 0]),
+                huge
+            )
+            mBlue = numpy.where(
+                numpy.abs(a[..., 0] - px) > tiny,
+                (py - a[..., 1]) / (px - a[..., 0]),
+                huge
+            )
+        return ~miss & (left | (mBlue >= mRed))
@@ -2,7 +2,6 @@
 
 __author__ = "amritansh"
 
-import pygame
 
 class CircleGoal:
     """
@@ -14,15 +13,12 @@ class CircleGoal:
     	Creates an instance of the CircleGoal
     	@param _radius The radius of the circle goal
     	@param _position The position of the circle goal
-    	@param _screen The pygame screen used to draw the circle
+    	@param _screen The renderer used to draw the circle
     	"""
 
-    	## PyGame screen used to draw the circle goal
+    	## Renderer used to draw the circle goal
     	self.screen   = _screen
 
-    	## List of colors given by PyGame
-        self.colors   = pygame.color.THECOLORS
-
         ## The radius of the circle goal
         self.radius   = _radius
 
@@ -31,11 +27,10 @@ class CircleGoal:
 
     def draw(self):
     	"""
-    	Draws the circle onto the pygame screen
+    	Draws the circle with the renderer
     	"""
-        pygame.draw.circle(
-            self.screen,
-            self.colors["green"],
+        self.screen.circle(
+            "green",
             self.position,
             self.radius,
             5
@@ -0,0 +1,112 @@
+__author__ = "amritansh"
+
+import math as np
+
+
+class KDTree:
+    """
+    Two dimensional k-d tree over a fixed list of points. Used to find
+    the roadmap samples close to a position without checking every
+    sample. Distances are computed the same way as PRMGenerator.norm, and
+    ties are always won by the point with the lowest index, so the results
+    match a linear scan over the point list
+    """
+    def __init__(self, _points):
+        """
+        Builds the tree
+        @param _points The list of points, the index of a point in the
+        list is the value returned by the queries
+        """
+
+        ## The points stored in the tree
+        self.points = list(_points)
+
+        ## Root node of the tree. A node is a tuple of the point index,
+        ## the split axis and the two subtrees (None when empty)
+        self.root = self.build(range(len(self.points)), 0)
+
+    def build(self, indexes, axis):
+        """
+        Builds the subtree of a list of points by splitting at the median
+        @param indexes The indexes of the points in the subtree
+        @param axis The axis to split along
+        @return The root node of the subtree
+        """
+        if not indexes:
+            return None
+        indexes = sorted(indexes, key=lambda i: self.points[i][axis])
+        mid = len(indexes) // 2
+        return (
+            indexes[mid],
+            axis,
+            self.build(indexes[:mid], 1 - axis),
+            self.build(indexes[mid + 1:], 1 - axis)
+        )
+
+    def norm(self, p1, p2):
+        """
+        Gets the distance between p1 and p2
+        @param p1 The first point
+        @param p2 The second point
+        @return The Eulidean distance from p1 to p2
+        """
+        return np.sqrt(pow(p1[0] - p2[0], 2) + pow(p1[1] - p2[1], 2))
+
+    def nearest(self, p, exclude=()):
+        """
+        Gets the point closest to p
+        @param p The point to be checked
+        @param exclude Indexes that are not allowed to be returned
+        @return The index of the closest point, or None if every point
+        is excluded
+        """
+        best = [None, None]
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            index, axis, left, right = node
+            diff = p[axis] - self.points[index][axis]
+            if best[0] is not None and abs(diff) > best[0]:
+                # only the near side can hold a closer point
+                stack.append(left if diff < 0 else right)
+                continue
+            if index not in exclude:
+                dist = self.norm(p, self.points[index])
+                if (
+                    best[0] is None or
+                    dist < best[0] or
+                    (dist == best[0] and index < best[1])
+                ):
+                    best = [dist, index]
+            # the near side is searched first so the bound tightens early
+            if diff < 0:
+                stack += [right, left]
+            else:
+                stack += [left, right]
+        return best[1]
+
+    def withinRadius(self, p, r):
+        """
+        Gets the points that are closer than a radius to p
+        @param p The point to be checked
+        @param r The radius around the point
+        @return A sorted list of the indexes of the points
+        """
+        found = list()
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            index, axis, left, right = node
+            diff = p[axis] - self.points[index][axis]
+            if diff > -r:
+                stack.append(right)
+            if diff < r:
+                stack.append(left)
+            if abs(diff) < r and self.norm(p, self.points[index]) < r:
+                found.append(index)
+        found.sort()
+        return found
@@ -1,7 +1,6 @@
 __author__ = "amritansh"
 
 import obstacle
-import configuration as con
 
 
 def mapVal(x, in_min, in_max, out_min, out_max):
@@ -28,6 +27,10 @@ def mparse(filename, staticObstacleList=list(), **kwargs):
     @param filename The file name of the map file
     @return A list of obstacles
     """
+    # the configuration imports this module (and the whole planner), so
+    # it is only imported once a map is parsed
+    import configuration as con
+
     polyList = kwargs.get("nodes", list())
     obstacleList = list()
 
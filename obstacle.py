@@ -5,7 +5,60 @@ __author__ = "amritansh"
 import sys
 import random
 import math as np
-import pygame
+
+try:
+    import geometry
+except ImportError:
+    geometry = None
+
+
+class PolyEdge(object):
+    """
+    Precomputed edge <a, b> of a PolyObstacle. (dx, dy) is b - a, atb2 is
+    its squared length, (minX, minY) to (maxX, maxY) is its bounding box,
+    lowX is the x coordinate of its lower end and mRed is the slope that
+    crossesEdge compares against. Only the coordinates change when the
+    polygon moves, so the edge is shifted rather than rebuilt
+    """
+    __slots__ = (
+        "ax", "ay", "bx", "by", "dx", "dy", "atb2",
+        "minX", "minY", "maxX", "maxY", "lowX", "mRed"
+    )
+
+    def __init__(self, a, b):
+        """
+        Precomputes an edge
+        @param a The starting node of the edge
+        @param b The ending node of the edge
+        """
+        self.ax, self.ay = map(float, a)
+        self.bx, self.by = map(float, b)
+        self.dx, self.dy = self.bx - self.ax, self.by - self.ay
+        self.atb2 = self.dx ** 2 + self.dy ** 2
+        self.minX, self.maxX = min(self.ax, self.bx), max(self.ax, self.bx)
+        self.minY, self.maxY = min(self.ay, self.by), max(self.ay, self.by)
+        low, high = ((self.bx, self.by), (self.ax, self.ay)) \
+            if self.ay > self.by else ((self.ax, self.ay), (self.bx, self.by))
+        self.lowX = low[0]
+        if abs(low[0] - high[0]) > sys.float_info.min:
+            self.mRed = (high[1] - low[1]) / (high[0] - low[0])
+        else:
+            self.mRed = sys.float_info.max
+
+    def shift(self, dx, dy):
+        """
+        Moves the edge
+        @param dx, dy The offset that the edge is moved by
+        """
+        self.ax += dx
+        self.ay += dy
+        self.bx += dx
+        self.by += dy
+        self.minX += dx
+        self.minY += dy
+        self.maxX += dx
+        self.maxY += dy
+        self.lowX += dx
 
 
 class PolyObstacle:
@@ -20,20 +73,17 @@ class PolyObstacle:
         variables
         @param _nodes A list of nodes used to represent the vertices
         of the polygon
-        @param _screen The PyGame screen that is used to draw the obstacle
+        @param _screen The renderer that is used to draw the obstacle
         """
 
         ## A list of nodes used to represent the vertices
         self.nodes = _nodes
 
-        ## A dictionary of colors defined in pygame
-        self.colors = pygame.color.THECOLORS
-
-        ## The PyGame screen that is used to draw the obstacle
+        ## The renderer that is used to draw the obstacle
         self.screen = _screen
 
         ## Bondaries of the simualation
-        self.boundary = (_screen.get_width(), _screen.get_height())
+        self.boundary = (_screen.getWidth(), _screen.getHeight())
 
         ## Defines wether the obstacle is dynamic or not
         self.dynamic = kwargs.get("dynamic", False)
@@ -50,13 +100,33 @@ class PolyObstacle:
         ## List of static obstacles
         self.obstacles = list()
 
+        ## Edges of the obstacles that were last checked for collisions
+        ## packed together (built the first time they are needed, and
+        ## again whenever other obstacles are close)
+        self.otherEdges = None
+
+        ## The obstacles that the packed edges belong to
+        self.otherEdgeOwners = list()
+
+        ## BVH over the obstacles (None means the whole obstacle list is
+        ## checked for collisions)
+        self.obstacleTree = None
+
         ## Start point
         self.start_point = kwargs.get("start_point", None)
 
         ## End point
         self.end_point = kwargs.get("end_point", None)
 
+        ## Precomputed edges of the polygon, walked in the same order as
+        ## getPoint walks them (see buildEdgeTable)
+        self.edgeTable = list()
+
+        ## The node list that the edge table was built from
+        self.tableNodes = None
+
         self.estimatePoly()
+        self.buildEdgeTable()
 
     def removeSelfFromObstacleList(self):
         """
@@ -103,164 +173,112 @@ class PolyObstacle:
             ]
         )
 
-    def detectCollision(self, pStart, pEnd):
+        ## Bounding box of the polygon as [min x, min y, max x, max y]
+        self.bounds = [
+            float(min(p[0] for p in self.nodes)),
+            float(min(p[1] for p in self.nodes)),
+            float(max(p[0] for p in self.nodes)),
+            float(max(p[1] for p in self.nodes))
+        ]
+
+    def buildEdgeTable(self):
         """
-        Detects a if there is a collision with the obstacle and
-        the line <pStart, pEnd>
-        @param pStart The starting point of the line
-        @param pEnd The ending point of the line
-        @return A boolean value representing if a collision occurred
+        Precomputes the edges of the polygon as PolyEdge objects, from
+        node k to node k + 1 starting with the closing edge
         """
-        interCross = lambda p1, p2, q1, q2: (
-            (
-                (p1[0] - p2[0]) *
-                (q1[1] - p1[1]) -
-                (p1[1] - p2[1]) *
-                (q1[0] - p1[0])
-            ) *
-            (
-                (p1[0] - p2[0]) *
-                (q2[1] - p1[1]) -
-                (p1[1] - p2[1]) *
-                (q2[0] - p1[0])
-            )
-        ) < 0
-        interCheck = lambda p1, p2, q1, q2: (
-            max(p1[0], p2[0]) >= min(q1[0], q2[0]) and
-            max(q1[0], q2[0]) >= min(p1[0], p2[0]) and
-            max(p1[1], p2[1]) >= min(q1[1], q2[1]) and
-            max(q1[1], q2[1]) >= min(p1[1], p2[1])
-        )
-        vecList = [[self.nodes[0], self.nodes[-1]]]
-        for k in range(len(self.nodes) - 1):
-            vecList += [
-                [
-                    self.nodes[k],
-                    self.nodes[k + 1]
-                ]
-            ]
-        return any(
-            map(
-                lambda p: (
-                    interCross(
-                        p[0],
-                        p[1],
-                        pStart,
-                        pEnd
-                    ) and
-                    interCheck(
-                        p[0],
-                        p[1],
-                        pStart,
-                        pEnd
-                    )
-                ),
-                vecList
-            )
-        )
+        self.edgeTable = [
+            PolyEdge(self.nodes[k], self.nodes[k + 1])
+            for k in range(-1, len(self.nodes) - 1)
+        ]
+        self.tableNodes = self.nodes
 
-    def getClosestPoint(self, a, b, p):
+    def shiftEdgeTable(self, dx, dy):
         """
-        Gets the closest point on line <a, b> to point p
-        @param a The starting point on the line
-        @param b The ending point of the line
-        @param p The point in which the closest distance will be checked
-        @return The closest point on line <a, b> to point p
+        Moves the edge table along with the polygon
+        @param dx, dy The offset that every node was moved by
         """
+        for e in self.edgeTable:
+            e.shift(dx, dy)
+        self.bounds = [
+            self.bounds[0] + dx,
+            self.bounds[1] + dy,
+            self.bounds[2] + dx,
+            self.bounds[3] + dy
+        ]
 
-        #pygame.draw.line(self.screen, self.colors["orange"], a, b, 4)
-        a = map(float, a)
-        b = map(float, b)
-        p = map(float, p)
-        xGreater = lambda r: r[0] >= max(a[0], b[0])
-        xLess = lambda r: r[0] <= min(a[0], b[0])
+    def getEdgeTable(self):
+        """
+        Gets the edge table, rebuilding it if the node list was replaced
+        @return The list of precomputed edges
+        """
+        if self.tableNodes is not self.nodes:
+            self.estimatePoly()
+            self.buildEdgeTable()
+        return self.edgeTable
 
-        yGreater = lambda r: r[1] >= max(a[1], b[1])
-        yLess = lambda r: r[1] <= min(a[1], b[1])
+    def getBounds(self):
+        """
+        Gets the bounding box of the polygon
+        @return The box as [min x, min y, max x, max y]
+        """
+        self.getEdgeTable()
+        return self.bounds
 
+    def detectCollision(self, pStart, pEnd):
+        """
+        Detects a if there is a collision with the obstacle and
+        the line <pStart, pEnd>
+        @param pStart The starting point of the line
+        @param pEnd The ending point of the line
+        @return A boolean value representing if a collision occurred
+        """
+        sx, sy = pStart
+        ex, ey = pEnd
+        loX, hiX = min(sx, ex), max(sx, ex)
+        loY, hiY = min(sy, ey), max(sy, ey)
+        table = self.getEdgeTable()
+        bounds = self.bounds
         if (
-                (xGreater(p) or xLess(p)) and
-                (yGreater(p) or yLess(p))
+            bounds[2] < loX or hiX < bounds[0] or
+            bounds[3] < loY or hiY < bounds[1]
         ):
-
-            if self.norm(a, p) < self.norm(b, p):
-                return a
+            return False
+        for k, e in enumerate(table):
+            # the closing edge is checked from node 0 to the last node,
+            # every other edge from node k to node k + 1
+            if k == 0:
+                p1x, p1y, vx, vy = e.bx, e.by, e.dx, e.dy
             else:
-                return b
-        else:
-            #"""
-            a_to_p = [
-                float(p[0] - a[0]),
-                float(p[1] - a[1])
-            ]
-            a_to_b = [
-                float(b[0] - a[0]),
-                float(b[1] - a[1])
-            ]
-            atb2 = a_to_b[0] ** 2 + a_to_b[1] ** 2
-            atp_dot_atb = a_to_p[0] * a_to_b[0] + a_to_p[1] * a_to_b[1]
-            t = float(atp_dot_atb) / float(atb2)
-            retVal =  (
-                float(a[0]) + a_to_b[0] * t,
-                float(a[1]) + a_to_b[1] * t
-            )
-
-            # This is unicorn magic, just freaking deal with it
+                p1x, p1y, vx, vy = e.ax, e.ay, -e.dx, -e.dy
             if (
-                    (xGreater(retVal) or xLess(retVal)) and
-                    (yGreater(retVal) or yLess(retVal))
+                (vx * (sy - p1y) - vy * (sx - p1x)) *
+                (vx * (ey - p1y) - vy * (ex - p1x)) < 0 and
+                e.maxX >= loX and hiX >= e.minX and
+                e.maxY >= loY and hiY >= e.minY
             ):
-                if self.norm(a, retVal) < self.norm(b, retVal):
-                    return a
-                else:
-                    return b
-
-            return retVal
-            #"""
-
-            #lam = -(a[0] * p[0] + a[1] * p[1]) / (p[0] * (b[0] - a[0]) + p[1] * (b[1] - a[1]))
-
-            #xk = (b[0] - a[0]) * lam + a[0]
-            #yk = (b[1] - a[1]) * lam + a[1]
+                return True
+        return False
 
-            #return (xk, yk)
-
-    def rayintersectseg(self, p, edge):
+    def crossesEdge(self, px, py, e):
         """
-        Determines if a ray from point p intersects with an edge, edge.
-        Used to determine if a point p in inside the polygon
-        @param p The point to be checked
-        @param edge The edge that will be checked
-        @return True if a ray from point p intersects with edge and false
-        otherwise
-        """
-        _eps = 0.00001
-        _huge = sys.float_info.max
-        _tiny = sys.float_info.min
-        a, b = edge
-        if a[1] > b[1]:
-            a, b = b, a
-        if p[1] == a[1] or p[1] == b[1]:
-            p = (p[0], p[1] + _eps)
-
-        intersect = False
-
-        if (p[1] > b[1] or p[1] < a[1]) or (p[0] > max(a[0], b[0])):
+        Determines if a ray from a point intersects with an edge of the
+        edge table. Used to determine if a point is inside the polygon
+        @param px, py The point to be checked
+        @param e The edge in the edge table
+        @return True if a ray from the point intersects with the edge and
+        false otherwise
+        """
+        if py == e.minY or py == e.maxY:
+            py = py + 0.00001
+        if py > e.maxY or py < e.minY or px > e.maxX:
             return False
-
-        if p[0] < min(a[0], b[0]):
-            intersect = True
+        if px < e.minX:
+            return True
+        if abs(e.lowX - px) > sys.float_info.min:
+            mBlue = (py - e.minY) / float(px - e.lowX)
         else:
-            if abs(a[0] - b[0]) > _tiny:
-                m_red = (b[1] - a[1]) / float(b[0] - a[0])
-            else:
-                m_red = _huge
-            if abs(a[0] - p[0]) > _tiny:
-                m_blue = (p[1] - a[1]) / float(p[0] - a[0])
-            else:
-                m_blue = _huge
-            intersect = m_blue >= m_red
-        return intersect
+            mBlue = sys.float_info.max
+        return mBlue >= e.mRed
 
     def _odd(self, x):
         """
@@ -279,13 +297,14 @@ class PolyObstacle:
         @param p The point to be checked
         @return True if the point is in the polygon and false otherwise
         """
-        vecList = [[self.nodes[0], self.nodes[-1]]]
-        for k in range(len(self.nodes) - 1):
-            vecList += [[self.nodes[k], self.nodes[k+1]]]
+        px, py = p
+        table = self.getEdgeTable()
+        # rays from points right of, above or below the polygon miss
+        # every edge
+        if px > self.bounds[2] or py > self.bounds[3] or py < self.bounds[1]:
+            return False
         return self._odd(
-            sum(
-                self.rayintersectseg(p, edge) for edge in vecList
-            )
+            sum(self.crossesEdge(px, py, e) for e in table)
         )
 
     def pointAllowed(self, b, p):
@@ -314,27 +333,41 @@ class PolyObstacle:
         @return The closest point that lies on the polygon exterior
         to p
         """
-        vecList = list()  # [[self.nodes[0],self.nodes[-1]]]
-        for k in range(-1, len(self.nodes) - 1):
-            vecList += [[self.nodes[k], self.nodes[k+1]]]
-        #print vecList
-        cpList = map(
-            lambda v: self.getClosestPoint(v[0], v[1], p),
-            vecList
-        )
-        dList = map(
-            lambda pv: self.norm(p, pv),
-            cpList
-        )
-
-        retVal = [
-            cpList[i] for i, j in enumerate(dList) if j == min(dList)
-        ][0]
+        px, py = map(float, p)
+        retVal, best = None, None
+        for e in self.getEdgeTable():
+            cp = self.closestEdgePoint(e, px, py)
+            d = self.norm(p, cp)
+            if best is None or d < best:
+                retVal, best = cp, d
 
         #pygame.draw.circle(self.screen, self.colors["green"], map(int, retVal), 5)
 
         return retVal
 
+    def closestEdgePoint(self, e, px, py):
+        """
+        Gets the closest point on an edge of the edge table to a point
+        @param e The edge in the edge table
+        @param px, py The point in which the closest distance will be checked
+        @return The closest point on the edge to the point
+        """
+        outside = lambda x, y: (
+            (x >= e.maxX or x <= e.minX) and (y >= e.maxY or y <= e.minY)
+        )
+        a, b = (e.ax, e.ay), (e.bx, e.by)
+        if outside(px, py):
+            p = (px, py)
+        else:
+            t = ((px - e.ax) * e.dx + (py - e.ay) * e.dy) / e.atb2
+            p = (e.ax + e.dx * t, e.ay + e.dy * t)
+            # This is unicorn magic, just freaking deal with it
+            if not outside(p[0], p[1]):
+                return p
+        if self.norm(a, p) < self.norm(b, p):
+            return a
+        return b
+
     def getRadius(self):
         """
         Gets the 'radius' of the checking point. Only used for
@@ -349,13 +382,62 @@ class PolyObstacle:
         Check to see if there is a collision with a static obstacle
         """
         # check for every static obstacle's nodes
-        for obstacle in self.obstacles:
+        candidates = self.obstacles
+        if self.obstacleTree is not None:
+            candidates = [
+                obst for obst in self.obstacleTree.near(node, 10)
+                if obst in self.obstacles
+            ]
+        for obstacle in candidates:
             if obstacle.pointInPoly(node):
                 return obstacle
             if self.norm(node, obstacle.getPoint(node)) <= 10:
                 return obstacle
         return None
 
+    def findCollisions(self, nodeList):
+        """
+        Checks every node in a list for collisions with the other
+        obstacles at once. Gives the same results as calling
+        checkCollisionWithOtherObstacles for every node. With an obstacle
+        tree only the obstacles near the nodes are packed and checked
+        @param nodeList The nodes to be checked
+        @return A list holding the first obstacle that every node
+        collides with (None if there is no collision)
+        """
+        if geometry is None or not self.obstacles:
+            return map(self.checkCollisionWithOtherObstacles, nodeList)
+        candidates = self.obstacles
+        if self.obstacleTree is not None:
+            # only the obstacles within 10 of the box around the nodes
+            # can collide with them
+            candidates = [
+                obst for obst in self.obstacleTree.inBox([
+                    min(x for x, _ in nodeList) - 10,
+                    min(y for _, y in nodeList) - 10,
+                    max(x for x, _ in nodeList) + 10,
+                    max(y for _, y in nodeList) + 10
+                ])
+                if obst in self.obstacles
+            ]
+        if not candidates:
+            return [None] * len(nodeList)
+        if self.otherEdges is None or self.otherEdgeOwners != candidates:
+            self.otherEdges = geometry.EdgeBuffer(
+                [obst.nodes for obst in candidates]
+            )
+            self.otherEdgeOwners = list(candidates)
+        else:
+            for k, obst in enumerate(candidates):
+                if obst.dynamic:
+                    self.otherEdges.update(k, obst.nodes)
+        dist = self.otherEdges.closestPointsPerPolygon(nodeList, True)[1]
+        hit = self.otherEdges.pointsInPolygons(nodeList, True) | (dist <= 10)
+        return [
+            candidates[row.argmax()] if row.any() else None
+            for row in hit
+        ]
+
     def checkNoGoZones(self, node):
         distance_start = np.sqrt(
             (self.start_point[0] - node[0]) ** 2
@@ -377,10 +459,10 @@ class PolyObstacle:
         Translate obstacle
         """
         # check collision
-        for node in self.nodes:
+        collisionList = self.findCollisions(self.nodes)
+        for node, obst in zip(self.nodes, collisionList):
 
             # collided with another obstacle?
-            obst = self.checkCollisionWithOtherObstacles(node)
             in_nogo_zones = self.checkNoGoZones(node)
             if obst or in_nogo_zones:
                 self.displacement = 0
@@ -417,6 +499,9 @@ class PolyObstacle:
             # convert back to tuple and replace old node
             self.nodes[i] = tuple(coord)
 
+        if self.tableNodes is self.nodes:
+            self.shiftEdgeTable(self.velocity[0], self.velocity[1])
+
         # record displacement
         self.displacement += self.norm(orig_coord, coord)
 
@@ -483,21 +568,25 @@ class PolyObstacle:
 
         self.displacement = 0
 
-    def draw(self):
+    def update(self):
         """
-        Draws the polygon on the PyGame screen
+        Moves the obstacle one step if it is dynamic
         """
         if self.dynamic:
             self.translate()
-            pygame.draw.polygon(
-                self.screen,
+
+    def draw(self):
+        """
+        Draws the polygon with the renderer
+        """
+        if self.dynamic:
+            self.screen.polygon(
                 (60, 60, 60),
                 self.nodes
             )
 
         else:
-            pygame.draw.polygon(
-                self.screen,
-                self.colors["grey"],
+            self.screen.polygon(
+                "grey",
                 self.nodes
             )
@@ -0,0 +1,125 @@
+__author__ = "amritansh"
+
+import ctypes
+import multiprocessing
+
+import numpy
+
+import flockengine
+
+## Engine of the pool that a worker process belongs to (only set inside
+## of the worker processes, by _initWorker)
+_workerEngine = None
+
+
+def _initWorker(engine):
+    """
+    Keeps the engine of the pool inside of a new worker process. The
+    engine is inherited when the pool forks, it is not copied
+    @param engine The ParallelFlockEngine that started the pool
+    """
+    global _workerEngine
+    _workerEngine = engine
+
+
+def _computeShard(task):
+    """
+    Computes one shard of a step inside of a worker process
+    @param task The first and one past the last boid index of the shard
+    and the current nodes of the dynamic obstacles
+    """
+    lo, hi, dynamicNodes = task
+    for obst, nodes in zip(_workerEngine.dynamicObstacles, dynamicNodes):
+        obst.nodes = nodes
+    _workerEngine.computeShard(lo, hi)
+
+
+class ParallelFlockEngine(flockengine.FlockEngine):
+    """
+    FlockEngine that splits the flock into shards and computes them on a
+    pool of worker processes. Every state array lives in shared memory, so
+    the workers read the frame t state and write their part of the frame
+    t + 1 buffers without copying the flock. Static obstacle geometry is
+    inherited by the workers when the pool forks, only the nodes of the
+    dynamic obstacles are sent along with every shard.
+
+    The pool has to be stopped with close, or by using the engine as a
+    context manager.
+    """
+    def __init__(self, _boidList, _obstacleList, _workers=None):
+        """
+        Creates the shared state and starts the worker pool
+        @param _boidList The list of boids in the flock
+        @param _obstacleList The list of obstacles (static and dynamic)
+        @param _workers The number of worker processes (one per core by
+        default)
+        """
+        flockengine.FlockEngine.__init__(self, _boidList, _obstacleList)
+
+        ## Obstacles whose nodes change between frames
+        self.dynamicObstacles = [
+            obst for obst in _obstacleList if getattr(obst, "dynamic", False)
+        ]
+
+        ## The number of worker processes
+        self.workers = _workers or multiprocessing.cpu_count()
+
+        ## Index ranges of the shards, one per worker
+        bounds = numpy.linspace(0, len(_boidList), self.workers + 1)
+        self.shards = [
+            (int(lo), int(hi)) for lo, hi in zip(bounds[:-1], bounds[1:])
+            if int(hi) > int(lo)
+        ]
+
+        ## Pool of worker processes that compute the shards (None once
+        ## it has been stopped)
+        self.pool = multiprocessing.Pool(
+            self.workers,
+            _initWorker,
+            (self,)
+        )
+
+    def allocate(self, shape, dtype=float):
+        """
+        Allocates a zeroed state array in shared memory
+        @param shape The shape of the array
+        @param dtype The type of the array
+        @return A NumPy view of the shared memory
+        """
+        dtype = numpy.dtype(dtype)
+        size = int(numpy.prod(shape)) * dtype.itemsize
+        raw = multiprocessing.RawArray(ctypes.c_char, max(size, 1))
+        return numpy.frombuffer(raw, dtype=dtype, count=int(numpy.prod(shape)))\
+            .reshape(shape)
+
+    def swapBuffers(self):
+        """
+        Copies the frame t + 1 buffers into the frame t arrays. The workers
+        hold their own references to the shared arrays, so the arrays are
+        copied rather than swapped
+        """
+        self.position[:] = self.nextPosition
+        self.heading[:] = self.nextHeading
+
+    def step(self):
+        """
+        Updates the heading and position of every boid in the flock due
+        to the potential fields, one shard per worker
+        """
+        self.prepare()
+        dynamicNodes = [list(obst.nodes) for obst in self.dynamicObstacles]
+        self.pool.map(
+            _computeShard,
+            [(lo, hi, dynamicNodes) for lo, hi in self.shards]
+        )
+        self.finish()
+
+    def close(self):
+        """
+        Stops the worker pool. Does nothing once it has been stopped
+        """
+        if self.pool is None:
+            return
+        self.pool.close()
+        self.pool.join()
+        self.pool = None
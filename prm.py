@@ -1,10 +1,99 @@
 
 __author__ = "amritansh"
-import random
+import bvh
+import csrgraph
 import dijkstra
+import dstarlite
 import goal
+import kdtree
+import samplers
+import unionfind
 import math as np
-import pygame
+
+try:
+    import numpy
+    import geometry
+except ImportError:
+    numpy = None
+    geometry = None
+
+
+class PenaltyRoadmap:
+    """
+    Read only view of a roadmap with a sparse set of edge weight
+    multipliers layered on top of it. Each boid reweights the roadmap
+    when it replans, the view keeps those penalties to itself so the
+    shared roadmap (and the rest of the flock) is never changed. Only the
+    multipliers are stored, the roadmap is never copied.
+    """
+    def __init__(self, _roadmap):
+        """
+        Creates a view of a roadmap without any penalties
+        @param _roadmap The roadmap (or another view of one) to be shared
+        """
+
+        ## The shared roadmap
+        self.roadmap = _roadmap
+
+        ## Dictionary that maps a node to the multipliers of its
+        ## penalized outgoing edges
+        self.multipliers = dict()
+
+        ## Reweighted neighbour dictionaries of the penalized nodes
+        self.weighted = dict()
+
+        ## Incremental search to the end goal kept for this view
+        ## (created by the PRMGenerator the first time it is needed)
+        self.search = None
+
+    def penalize(self, node, factor=3):
+        """
+        Multiplies the weight of every edge leaving a node
+        @param node The node whose edges are penalized
+        @param factor The value the weights are multiplied by
+        """
+        mults = self.multipliers.setdefault(node, dict())
+        for key in self.roadmap[node]:
+            mults[key] = mults.get(key, 1) * factor
+        self.edgesChanged(node)
+
+    def edgesChanged(self, node):
+        """
+        Tells the view (and its search) that the edges leaving a node were
+        reweighted or removed
+        @param node The node
+        """
+        self.weighted.pop(node, None)
+        if self.search is not None:
+            self.search.edgesChanged(node)
+
+    def __getitem__(self, node):
+        """
+        Gets the weighted neighbours of a node
+        @param node The node
+        @return Dictionary that maps a neighbour to the edge weight
+        """
+        if node not in self.multipliers:
+            return self.roadmap[node]
+        if node not in self.weighted:
+            mults = self.multipliers[node]
+            self.weighted[node] = dict(
+                (key, weight * mults.get(key, 1))
+                for key, weight in self.roadmap[node].items()
+            )
+        return self.weighted[node]
+
+    def __contains__(self, node):
+        return node in self.roadmap
+
+    def __iter__(self):
+        return iter(self.roadmap)
+
+    def __len__(self):
+        return len(self.roadmap)
+
+    def keys(self):
+        return self.roadmap.keys()
 
 
 class PRMGenerator:
@@ -22,7 +111,8 @@ class PRMGenerator:
         _xSize,
         _ySize,
         _subGoalNumber,
-        _screen
+        _screen,
+        _sampler="uniform"
     ):
         """
         Creates a new instance of the PRMGenerator. Intializes key variables
@@ -33,25 +123,30 @@ class PRMGenerator:
         @param _xSize The size of the x component of the screen
         @param _ySize The size of the y component of the screen
         @param _subGoalNumber The initial number of sample points for the global planner
-        @param _screen The PyGame screen that the PRMGenerator will draw to
+        @param _screen The renderer that the PRMGenerator will draw with
+        @param _sampler The name of the sampler that places the sample
+        points (one of samplers.SAMPLERS)
         """
 
         ## List of obstacles
         self.obstacleList = _obstacleList
 
+        ## BVH over the bounding boxes of the obstacles
+        self.obstacleTree = bvh.ObstacleTree(_obstacleList)
+
         ## Position of the first goal
         self.startPos = _startPos
 
         ## Position of the last goal
         self.endPos = _endPos
 
-        ## PyGame screen that is will be drawn on
+        ## Renderer that the roadmap is drawn with
         self.screen = _screen
 
-        ## Horizontal size of the PyGame screen
+        ## Horizontal size of the screen
         self.xSize = _xSize
 
-        ## Vertical size of the PyGame screen
+        ## Vertical size of the screen
         self.ySize = _ySize
 
         ## Distance that the PRM is willing to check when
@@ -61,9 +156,34 @@ class PRMGenerator:
         ## Maximum number of sample points that can be connected
         self.numNext = 20
 
+        ## How adjacentThresh and numNext are chosen. "fixed" keeps them,
+        ## "prm_star" scales them with the number of sample points
+        self.connection = "fixed"
+
+        ## Area of the screen that is far enough from the static
+        ## obstacles for sample points (None until it is first needed)
+        self.freeArea = None
+
         ## Number of initial sample points
         self.subGoalNumber = _subGoalNumber
 
+        ## Distance to the static obstacles that a sample point needs
+        ## to be kept
+        self.minClearance = 10
+
+        ## Edges of the static obstacles packed together (None until the
+        ## clearance of a position is first needed, or without NumPy)
+        self.staticEdges = None
+
+        ## Places the sample points
+        self.sampler = samplers.makeSampler(
+            _sampler,
+            self.xSize,
+            self.ySize,
+            self.staticClearance,
+            self.minClearance
+        )
+
         ## Initial positions of the sample points
         self.subGoalPositionList = [self.startPos] + \
             self.generatePositionList(self.subGoalNumber) + \
@@ -81,8 +201,63 @@ class PRMGenerator:
         self.goalNodes = list()
         ## Dictionary (for easy access) that holds the weights for the nodes
         self.omegaDict = dict()
+
+        ## Edges of every obstacle packed together, used to weight the
+        ## nodes (None until it is first needed, or without NumPy)
+        self.obstacleEdges = None
+
+        ## Weights of the sample points in index order, extended as
+        ## sample points are added (None without NumPy)
+        self.nodeOmega = None
+
+        ## Smallest edge weight per unit of length in the roadmap
+        self.costScale = 0
+
+        ## Node that the shortest path tree leads to
+        self.treeRoot = None
+
+        ## Shortest path tree of the roadmap, maps a node to the
+        ## length of its shortest path to treeRoot
+        self.treeDist = dict()
+
+        ## Shortest path tree of the roadmap, maps a node to the next
+        ## node on its shortest path to treeRoot
+        self.treeNext = dict()
+
+        ## The reversed roadmap, maps a node to the nodes with an edge
+        ## leading to it
+        self.treePredecessors = dict()
+
+        ## The roadmap packed into a CSRGraph
+        self.roadmapGraph = None
+
+        ## k-d tree over the sample points, rebuilt whenever the sample
+        ## points change
+        self.sampleTree = None
+
+        ## Function called with the number of connected sample points and
+        ## the number of sample points every time a sample point has been
+        ## connected (None reports nothing). The roadmap is never drawn
+        ## while it is built unless this draws it
+        self.progress = None
+
+        ## Defines if the roadmap is lazy. The edges of a lazy roadmap are
+        ## only checked for collisions once a path uses them
+        self.lazy = False
+
+        ## Edges of a lazy roadmap that have been checked for collisions,
+        ## maps a (smaller node, larger node) pair to True when the edge is
+        ## collision free
+        self.checkedEdges = dict()
         self.filterSubGoal()
 
+        ## Index of the end goal. Samples added later are appended after
+        ## it, so the indexes of the sample points never change
+        self.endNode = len(self.subGoalPositionList) - 1
+
+        ## Connected components of the roadmap
+        self.components = unionfind.UnionFind()
+
         self.initOmega(self.subGoalPositionList)
 
     def norm(self, p1, p2):
@@ -96,22 +271,76 @@ class PRMGenerator:
 
     def generatePositionList(self, num):
         """
-        Generates the random positions for the sample points
+        Generates the positions for the sample points with the sampler
         @param num The number of points to generate
         @return A list of random subgoals (sample points)
         """
-        return [
-            (
-                self.getRandom(0, self.xSize),
-                self.getRandom(0, self.ySize)
-            ) for _ in range(num)
+        return self.sampler.generate(num)
+
+    def staticClearance(self, posList):
+        """
+        Gets the closest point of the static obstacles to every position
+        and the signed distance to it. All positions are checked at once
+        against the packed static obstacle edges, with the same closest
+        points as getPoint
+        @param posList The list of positions
+        @return A list of closest points (None without static obstacles)
+        and a list of distances, negative inside of an obstacle
+        """
+        staticObstacles = [
+            obst for obst in self.obstacleList if obst.dynamic is False
         ]
+        if not staticObstacles or not posList:
+            return [None] * len(posList), [float("inf")] * len(posList)
+        if geometry is not None:
+            if self.staticEdges is None:
+                self.staticEdges = geometry.EdgeBuffer(
+                    [obst.nodes for obst in staticObstacles]
+                )
+            closest, dist, _ = self.staticEdges.closestPoints(posList, True)
+            inside = self.staticEdges.pointsInPolygons(posList, True)
+            return (
+                [tuple(p) for p in closest],
+                [-d if i else d for d, i in zip(dist, inside.any(axis=1))]
+            )
+        closestList, distList = list(), list()
+        for p in posList:
+            closest, dist = None, None
+            for obst in staticObstacles:
+                q = obst.getPoint(p)
+                d = self.norm(q, p)
+                if dist is None or d < dist:
+                    closest, dist = q, d
+            if any(obst.pointInPoly(p) for obst in staticObstacles):
+                dist = -dist
+            closestList.append(closest)
+            distList.append(dist)
+        return closestList, distList
 
     def initOmega(self, posList):
         """
-        Initiates the omega function which holds the node weights
+        Initiates the omega function which holds the node weights. The
+        weights of all of the positions are found at once from the packed
+        edges of the obstacles, with the same closest points as getPoint
         @param posList The list of positions for the sample points
         """
+        if geometry is not None and self.obstacleList and posList:
+            if self.obstacleEdges is None:
+                self.obstacleEdges = geometry.EdgeBuffer(
+                    [ob.nodes for ob in self.obstacleList]
+                )
+            else:
+                # the dynamic obstacles can have moved since
+                for k, ob in enumerate(self.obstacleList):
+                    if ob.dynamic:
+                        self.obstacleEdges.update(k, ob.nodes)
+            dist = self.obstacleEdges.closestPointsPerPolygon(
+                posList,
+                True
+            )[1]
+            for p, w in zip(posList, dist.sum(axis=1)):
+                self.omegaDict[p] = float(w)
+            return
         omega = lambda p: (
             sum(
                 map(
@@ -123,45 +352,199 @@ class PRMGenerator:
         for p in posList:
             self.omegaDict[p] = omega(p)
 
+    def edgeWeights(self, edges):
+        """
+        Weights edges by their length divided by the smaller weight of
+        their two nodes. With NumPy the node weights are kept in an array
+        and every edge is weighted in one array expression
+        @param edges List of (node, node) pairs
+        @return A list of the edge weights
+        """
+        pos = self.subGoalPositionList
+        if numpy is None:
+            return [
+                1000 * self.norm(pos[i], pos[p]) /
+                min(self.omegaDict[pos[i]], self.omegaDict[pos[p]])
+                for i, p in edges
+            ]
+        if self.nodeOmega is None:
+            self.nodeOmega = numpy.zeros(0)
+        if len(self.nodeOmega) < len(pos):
+            self.nodeOmega = numpy.concatenate((
+                self.nodeOmega,
+                [self.omegaDict[p] for p in pos[len(self.nodeOmega):]]
+            ))
+        if not edges:
+            return []
+        i, p = numpy.array(edges).T
+        points = numpy.array(pos, dtype=float)
+        diff = points[i] - points[p]
+        omega = numpy.minimum(self.nodeOmega[i], self.nodeOmega[p])
+        if not omega.all():
+            # NumPy would give inf (or nan), the weights without it raise
+            raise ZeroDivisionError("edge weight with a node weight of 0")
+        return list(1000 * numpy.sqrt((diff * diff).sum(axis=1)) / omega)
+
+    def updateCostScale(self):
+        """
+        Finds the smallest edge weight per unit of length in the roadmap.
+        Edge weights are the length of the edge divided by a node weight,
+        so the scale is taken from the edges themselves. Removing the
+        blocked edges of a lazy roadmap can only raise it, so it stays a
+        lower bound
+        """
+        self.costScale = min([
+            w / self.norm(
+                self.subGoalPositionList[k],
+                self.subGoalPositionList[p]
+            )
+            for k in self.roadmap.keys()
+            for p, w in self.roadmap[k].items()
+            if self.subGoalPositionList[k] != self.subGoalPositionList[p]
+        ] or [0])
+
+    def estimateCost(self, i, j):
+        """
+        Gets a lower bound of the weight of any path between two nodes,
+        the straight line distance scaled by costScale
+        @param i The index of the first node
+        @param j The index of the second node
+        @return The lower bound
+        """
+        return self.costScale * self.norm(
+            self.subGoalPositionList[i],
+            self.subGoalPositionList[j]
+        )
+
     def filterSubGoal(self):
         """
         Filters out sample points that are inside of obstacles
         or otherwise inadequate
         """
-        delList = list()
+        self.subGoalPositionList = self.filterPositions(
+            self.subGoalPositionList
+        )
+        self.sampleTree = kdtree.KDTree(self.subGoalPositionList)
+        # the indexes of the checked edges no longer hold
+        self.checkedEdges = dict()
 
-        for i in range(len(self.subGoalPositionList)):
-            for obst in self.obstacleList:
-                if obst.dynamic is False:
-                    dist = self.norm(
-                        obst.getPoint(self.subGoalPositionList[i]),
-                        self.subGoalPositionList[i]
-                    )
-                    if (dist < 10):
-                        delList += [i]
+    def addSamples(self, num):
+        """
+        Adds new sample points after the existing ones. The indexes of the
+        existing sample points do not change, so the roadmap is kept and
+        only the new sample points have to be connected
+        @param num The number of points to generate (before filtering)
+        """
+        newPosList = self.filterPositions(self.generatePositionList(num))
+        self.initOmega(newPosList)
+        self.subGoalPositionList += newPosList
+        self.sampleTree = kdtree.KDTree(self.subGoalPositionList)
+        self.components.grow(len(self.subGoalPositionList))
+
+    def getFreeArea(self):
+        """
+        Estimates the area of the screen outside of the static obstacles
+        (and clear of them) from a coarse grid of probe positions. The
+        estimate only scales the connection radius, so a few hundred
+        probes are enough. The estimate is kept
+        @return The free area
+        """
+        if self.freeArea is None:
+            step = 40
+            probes = [
+                (x, y)
+                for x in range(step / 2, self.xSize, step)
+                for y in range(step / 2, self.ySize, step)
+            ]
+            # unlike filterPositions, probes deep inside of an obstacle
+            # are not free
+            free = sum(
+                1 for d in self.staticClearance(probes)[1]
+                if d >= self.minClearance
+            )
+            self.freeArea = self.xSize * self.ySize * free / float(
+                max(len(probes), 1)
+            )
+        return self.freeArea
 
-        self.subGoalPositionList = [
-            self.subGoalPositionList[j] for j in range(
-                len(self.subGoalPositionList)
-            ) if not j in delList
+    def updateConnection(self):
+        """
+        Scales the connection radius (adjacentThresh) and the number of
+        neighbours (numNext) with the number of sample points as in PRM*.
+        The radius shrinks with sqrt(log(n) / n) and the number of
+        neighbours grows with log(n), the smallest values for which the
+        roadmap still converges to the shortest paths, so the number of
+        edges grows predictably with the number of sample points
+        """
+        if self.connection != "prm_star":
+            return
+        n = max(len(self.subGoalPositionList), 2)
+        # gamma > 2 * (1 + 1 / d) ^ (1 / d) * (area / unit ball) ^ (1 / d)
+        # in d = 2 dimensions
+        gamma = 2 * np.sqrt(1.5) * np.sqrt(self.getFreeArea() / np.pi)
+        self.adjacentThresh = gamma * np.sqrt(np.log(n) / n)
+        self.numNext = int(np.ceil(np.e * 1.5 * np.log(n)))
+
+    def filterPositions(self, posList):
+        """
+        Filters out positions that are too close to the exterior of the
+        static obstacles
+        @param posList The list of positions
+        @return A list of the remaining positions, in the same order
+        """
+        dist = self.staticClearance(posList)[1]
+        return [
+            posList[j] for j in range(len(posList))
+            if not abs(dist[j]) < self.minClearance
         ]
 
-    def findNeighbors(self, point):
+    def findCandidates(self, points):
+        """
+        Finds the sample points within adjacentThresh of every point that
+        no static obstacle blocks. The edges to the sample points of all
+        of the points are checked against the packed static obstacle edges
+        at once (or left to findNeighbors without NumPy). Nothing is
+        checked for a lazy roadmap
+        @param points The list of points
+        @return A list (one per point) of (index, position) pairs
+        """
+        pairs = [
+            (k, i) for k, point in enumerate(points)
+            for i in self.sampleTree.withinRadius(point, self.adjacentThresh)
+        ]
+        blocked = [False] * len(pairs)
+        if self.staticEdges is not None and pairs and not self.lazy:
+            blocked = self.staticEdges.segmentsCollide(
+                [points[k] for k, _ in pairs],
+                [self.subGoalPositionList[i] for _, i in pairs]
+            )
+        candidates = [list() for _ in points]
+        for (k, i), hit in zip(pairs, blocked):
+            if not hit:
+                candidates[k].append((i, self.subGoalPositionList[i]))
+        return candidates
+
+    def findNeighbors(self, point, candidates=None):
         """
         Finds suitable neighbours for a sample point
+        @param point The sample point
+        @param candidates The result of findCandidates for the point
+        (found when not given)
+        @return A list of (index, position) pairs of the closest visible
+        sample points
         """
-        minList = list()
-        obList = filter(
-            lambda ob: self.norm(
-                point,
-                ob.avgPoint
-            ) < self.adjacentThresh + ob.maxDist,
-            self.obstacleList
-        )
-        sGoalList = filter(
-            lambda g: self.norm(point, g[1]) < self.adjacentThresh,
-            enumerate(self.subGoalPositionList)
+        if candidates is None:
+            candidates = self.findCandidates([point])[0]
+        # the static obstacles were already checked by findCandidates
+        # unless they could not be packed (or the roadmap is lazy)
+        unchecked = not self.lazy and any(
+            ob.dynamic or self.staticEdges is None
+            for ob in self.obstacleList
         )
+        obList = lambda p: [
+            ob for ob in self.obstacleTree.alongSegment(point, p)
+            if ob.dynamic or self.staticEdges is None
+        ] if unchecked else []
         searchList = filter(
             lambda p: not any(
                 filter(
@@ -169,111 +552,176 @@ class PRMGenerator:
                         point,
                         p[1]
                     ),
-                    obList
+                    obList(p[1])
                 )
             ),
-            sGoalList
+            candidates
         )
-        normList = dict()
-        maxVal = self.xSize * self.ySize
-        for i, j in searchList:
-            normList[i] = self.norm(point, j)
-        for _ in range(self.numNext):
-            try:
-                minPos = [
-                    (i, j) for i, j in searchList if normList[i] == min(normList.values())
-                ][0]
-                minList += [minPos]
-                normList[minPos[0]] = maxVal
-            except IndexError:
-                print 'balls'
+        minList = sorted(
+            searchList,
+            key=lambda p: (self.norm(point, p[1]), p[0])
+        )[:self.numNext]
+        # when there are not enough neighbours the rest of the
+        # slots are filled with the first one
+        if minList:
+            minList += [searchList[0]] * (self.numNext - len(minList))
         return minList
 
-    def getRandom(self, p, q):
+    def segmentsBlocked(self, segments):
         """
-        Gets a random number and cathes the ValueError
-        if the two numbers are the same
-        @param p Lower bound for the random number
-        @param q upper bound for the random number
-        @return A random number
+        Checks segments against every obstacle, the static obstacles all
+        at once when they are packed
+        @param segments List of (start, end) position pairs
+        @return A list of booleans, True where a segment collides with
+        an obstacle
         """
-        try:
-            return random.randint(int(p), int(q))
-        except ValueError:
-            return int(p)
+        # a single segment is checked faster through the BVH
+        packed = self.staticEdges is not None and len(segments) > 1
+        blocked = [False] * len(segments)
+        if packed:
+            blocked = list(self.staticEdges.segmentsCollide(
+                [s for s, _ in segments],
+                [e for _, e in segments]
+            ))
+        for k, (s, e) in enumerate(segments):
+            if not blocked[k]:
+                blocked[k] = any(
+                    ob.detectCollision(s, e)
+                    for ob in self.obstacleTree.alongSegment(s, e)
+                    if ob.dynamic or not packed
+                )
+        return blocked
+
+    def checkEdges(self, edges):
+        """
+        Checks edges of a lazy roadmap that have not been checked yet and
+        removes the ones that collide with an obstacle (in both directions)
+        @param edges List of (node, node) pairs
+        @return A list of the edges that are blocked, including the ones
+        that were already removed before
+        """
+        edges = sorted(set((min(u, v), max(u, v)) for u, v in edges))
+        unchecked = [edge for edge in edges if edge not in self.checkedEdges]
+        blocked = self.segmentsBlocked([
+            (self.subGoalPositionList[u], self.subGoalPositionList[v])
+            for u, v in unchecked
+        ])
+        for (u, v), hit in zip(unchecked, blocked):
+            self.checkedEdges[(u, v)] = not hit
+            if not hit:
+                continue
+            self.roadmap.get(u, dict()).pop(v, None)
+            self.roadmap.get(v, dict()).pop(u, None)
+        return [edge for edge in edges if not self.checkedEdges[edge]]
+
+    def lazyShortestPath(self, start, end, roadmap=None):
+        """
+        Finds the shortest collision free path on a lazy roadmap. The
+        tentative shortest path is checked, its blocked edges are removed
+        and the roadmap is searched again until every edge on the path is
+        collision free
+        @param start The starting node
+        @param end The ending node
+        @param roadmap The roadmap or a PenaltyRoadmap view of it (the
+        roadmap when not given)
+        @return A list of the nodes on the path (as dijkstra.shortestPath)
+        """
+        if roadmap is None:
+            roadmap = self.roadmap
+        while True:
+            path = dijkstra.shortestPath(
+                roadmap,
+                start,
+                end,
+                lambda k: self.estimateCost(k, end)
+            )
+            # the other edges of the nodes on the path are checked in the
+            # same batch, the next path is likely to run through them
+            edges = zip(path, path[1:])
+            blocked = self.checkEdges(edges + [
+                (k, p) for k in path for p in self.roadmap.get(k, ())
+            ])
+            if not set(blocked) & set(
+                (min(u, v), max(u, v)) for u, v in edges
+            ):
+                return path
+            # a view keeps reweighted copies of the edges of its nodes
+            if isinstance(roadmap, PenaltyRoadmap):
+                for u, v in blocked:
+                    roadmap.edgesChanged(u)
+                    roadmap.edgesChanged(v)
 
     def generate(self, subGoalRadius):
         """
         Generates a series of random points that will become the
         roadmap and connects them and weights them into a graph.
         If the goal and the starting point are not connected, more
-        points are added. The roadmap is then searched for the shortest
-        weighted distance which become the intermediate goals.
+        points are added and only the new points are connected. The
+        roadmap is then searched for the shortest weighted distance which
+        become the intermediate goals. It is only searched once the
+        connected components show that a path exists
         @param subGoalRadius The radius of the intermediate goals
         @return A list of sub goals from the roadmap connecting
         the starting point and the end goal
         """
         self.roadmap = dict()
+        self.components = unionfind.UnionFind(len(self.subGoalPositionList))
         currentPos = 0
-        self.dontDraw = list()
-        while len(self.gPosList) <= 1:
+        while True:
+            self.updateConnection()
+            candidates = self.findCandidates(
+                self.subGoalPositionList[currentPos:]
+            )
+            neighbors = [
+                self.findNeighbors(j, candidates[i])
+                for i, j in enumerate(self.subGoalPositionList[currentPos:])
+            ]
+            # the edges of every new sample point are weighted at once
+            weights = iter(self.edgeWeights([
+                (i, p)
+                for i, pairs in enumerate(neighbors, currentPos)
+                for p, _ in pairs
+            ]))
             for i, j in enumerate(self.subGoalPositionList):
                 # adds the neighbours for a certain vertex to the its sub
                 # dictionary neighbours are decided by linear distance
 
                 if i >= currentPos:
                     self.roadmap[i] = dict()
-                    for p, q in self.findNeighbors(j):
-                        self.roadmap[i][p] = (
-                            1000 * self.norm(j, q) /
-                            min(
-                                self.omegaDict[j],
-                                self.omegaDict[q]
-                            )
-                        )
+                    for p, q in neighbors[i - currentPos]:
+                        self.roadmap[i][p] = next(weights)
                         try:
                             self.roadmap[p][i] = self.roadmap[i][p]
                         except KeyError:
                             pass
-
-                    self.screen.fill(
-                        (255, 255, 255)
+                        else:
+                            # only edges in both directions join the
+                            # components
+                            self.components.union(i, p)
+
+                    if self.progress is not None:
+                        self.progress(i + 1, len(self.subGoalPositionList))
+            if self.components.connected(0, self.endNode):
+                self.updateCostScale()
+                if self.lazy:
+                    # blocked edges can still disconnect a lazy roadmap
+                    self.goalNodes = self.lazyShortestPath(0, self.endNode)
+                else:
+                    self.goalNodes = dijkstra.shortestPath(
+                        self.roadmap,
+                        0,
+                        self.endNode,
+                        lambda k: self.estimateCost(k, self.endNode)
                     )
-
-                    self.draw()
-
-                    map(
-                        lambda o: o.draw(),
-                        self.obstacleList
-                    )
-                    pygame.display.flip()
-                    for e in pygame.event.get():
-                        if e.type is pygame.QUIT:
-                            exit()
-            self.goalNodes = dijkstra.shortestPath(
-                self.roadmap,
-                0,
-                len(self.subGoalPositionList) - 1
-            )
-            self.gPosList = map(
-                lambda k: self.subGoalPositionList[k],
-                self.goalNodes
-            )
-            if len(self.gPosList) == 1:
-                currentPos = len(self.subGoalPositionList) - 1
-
-                self.dontDraw += [
-                    currentPos,
-                    currentPos - 1,
-                    currentPos + 1,
-                ]
-
-                newPosList = self.generatePositionList(
-                    int(self.subGoalNumber / 2) + 1
-                )
-                self.initOmega(newPosList)
-                self.subGoalPositionList[1: -1] += newPosList
-                self.filterSubGoal()
+                if len(self.goalNodes) > 1:
+                    break
+            currentPos = len(self.subGoalPositionList)
+            self.addSamples(int(self.subGoalNumber / 2) + 1)
+        self.gPosList = map(
+            lambda k: self.subGoalPositionList[k],
+            self.goalNodes
+        )
+        self.buildPathTree(self.endNode)
         #print self.roadmap
         retList = map(
             lambda p: goal.CircleGoal(
@@ -287,20 +735,123 @@ class PRMGenerator:
         retList[-1].radius = 1 * subGoalRadius
         return retList
 
+    def getPenaltyRoadmap(self):
+        """
+        Gets a view of the roadmap that can be penalized by a single boid
+        @return A PenaltyRoadmap of the current roadmap
+        """
+        return PenaltyRoadmap(self.roadmap)
+
+    def buildPathTree(self, root):
+        """
+        Packs the roadmap into CSR graphs and finds the shortest path from
+        every node of the roadmap to one node by searching the reversed
+        roadmap once. Has to be called again whenever the roadmap changes
+        @param root The node that the paths lead to (the end goal)
+        """
+        self.roadmapGraph = csrgraph.CSRGraph(self.roadmap)
+        self.treePredecessors = csrgraph.CSRGraph(self.roadmap, True)
+        self.treeRoot = root
+        self.treeDist, self.treeNext = {root: 0}, dict()
+        if root in self.treePredecessors:
+            dist, pred = self.treePredecessors.search(root)
+            for k in range(self.treePredecessors.size):
+                if pred[k] != -1:
+                    self.treeDist[k] = dist[k]
+                    self.treeNext[k] = pred[k]
+
     def getShortestPath(self, roadmap, fromNode, toNode):
-        return dijkstra.shortestPath(
-            roadmap,
-            fromNode,
-            toNode
+        """
+        Finds the shortest path between two nodes of a roadmap. Paths on
+        the roadmap to the root of the shortest path tree are read from
+        the tree. Paths on a PenaltyRoadmap view of the roadmap use an
+        incremental search that is kept by the view, it starts from the
+        tree and only repairs what the penalties of the view changed.
+        Other paths on the roadmap are found on its CSR graph (the packed
+        search is faster than A* with the weak bound of estimateCost),
+        the rest with A*. Penalties can only make edges
+        heavier, so estimateCost stays a lower bound on every view.
+
+        Paths on a lazy roadmap (or a view of one) are always found with
+        lazyShortestPath, the packed graphs and the tree hold edges that
+        were never checked
+        @param roadmap The roadmap or a PenaltyRoadmap view of it
+        @param fromNode The starting node
+        @param toNode The ending node
+        @return A list of the nodes on the shortest path
+        """
+        if self.lazy:
+            return self.lazyShortestPath(fromNode, toNode, roadmap)
+        heuristic = lambda k: self.estimateCost(k, toNode)
+        if (
+            roadmap is self.roadmap and
+            self.roadmapGraph is not None and
+            toNode != self.treeRoot
+        ):
+            return self.roadmapGraph.shortestPath(fromNode, toNode)
+        if toNode != self.treeRoot:
+            return dijkstra.shortestPath(roadmap, fromNode, toNode, heuristic)
+
+        # matches dijkstra.shortestPath for missing and unreachable nodes
+        if fromNode not in self.roadmap:
+            return []
+
+        if roadmap is self.roadmap:
+            path = [fromNode]
+            while path[-1] in self.treeNext:
+                path.append(self.treeNext[path[-1]])
+        elif (
+            isinstance(roadmap, PenaltyRoadmap) and
+            roadmap.roadmap is self.roadmap
+        ):
+            search = roadmap.search
+            if search is None or search.seed is not self.treeDist:
+                roadmap.search = dstarlite.DStarLite(
+                    roadmap,
+                    toNode,
+                    self.treePredecessors,
+                    self.treeDist,
+                    self.estimateCost
+                )
+                for k in roadmap.multipliers.keys():
+                    roadmap.search.edgesChanged(k)
+            path = roadmap.search.getPath(fromNode)
+        else:
+            return dijkstra.shortestPath(roadmap, fromNode, toNode, heuristic)
+
+        if not path or path[-1] != toNode:
+            return [toNode]
+        return path
+
+    def drawProgress(self, connected, total):
+        """
+        Shows the roadmap as it is being built, used as the progress
+        function (through a renderer.Throttle to limit the redraws)
+        @param connected The number of connected sample points
+        @param total The number of sample points
+        """
+        self.screen.fill(
+            (255, 255, 255)
         )
 
+        self.draw()
+
+        map(
+            lambda o: o.draw(),
+            self.obstacleList
+        )
+        self.screen.present()
+        if self.screen.quitRequested():
+            exit()
+
     def draw(self):
         """
         Draws the graph
         """
+        if not self.screen.visual:
+            return
         map(
-            lambda circ: pygame.draw.circle(
-                self.screen,
+            lambda circ: self.screen.circle(
                 (100, 100, 100),
                 circ,
                 5
@@ -309,20 +860,17 @@ class PRMGenerator:
         )
         for k in self.roadmap.keys():
             for p in self.roadmap[k].keys():
-                if not k in self.dontDraw and not p in self.dontDraw:
-                    pygame.draw.line(
-                        self.screen,
-                        (0, 0, 0),
-                        self.subGoalPositionList[k],
-                        self.subGoalPositionList[p]
-                    )
+                self.screen.line(
+                    (0, 0, 0),
+                    self.subGoalPositionList[k],
+                    self.subGoalPositionList[p]
+                )
 
     def drawPath(self):
         """
         Draws the selected shortest path
         """
-        pygame.draw.lines(
-            self.screen,
+        self.screen.lines(
             # (255, 255, 255),
             (0, 255, 0),
             False,
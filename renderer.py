@@ -0,0 +1,366 @@
+__author__ = "amritansh"
+
+import os
+import time
+
+## The pygame module, imported the first time a visual renderer needs it
+pygame = None
+
+
+def importPygame():
+    """
+    Imports pygame the first time it is needed, so the simulation can
+    run without it (or a display) when nothing is drawn
+    @return The pygame module
+    """
+    global pygame
+    if pygame is None:
+        import pygame as module
+        pygame = module
+    return pygame
+
+
+class NullRenderer:
+    """
+    Renderer that draws nothing. Everything that draws the simulation
+    (the obstacles, the boids, the goals and the roadmap) goes through a
+    renderer, so with this one the simulation runs without pygame or a
+    display. The visual renderers extend it
+    """
+
+    ## Defines if anything is drawn. Drawing code that is expensive on its
+    ## own (like walking every roadmap edge) is skipped when it is not
+    visual = False
+
+    ## Defines if the renderer is shown on a display that takes input
+    interactive = False
+
+    def __init__(self, _dim):
+        """
+        Creates a new renderer
+        @param _dim The (width, height) of the drawing area
+        """
+
+        ## Width and height of the drawing area
+        self.dim = tuple(_dim)
+
+    def getWidth(self):
+        return self.dim[0]
+
+    def getHeight(self):
+        return self.dim[1]
+
+    def setCaption(self, caption):
+        """
+        Sets the caption of the window
+        @param caption The caption
+        """
+        pass
+
+    def fill(self, color):
+        """
+        Fills the drawing area
+        @param color The color, an (r, g, b) tuple or a color name
+        """
+        pass
+
+    def circle(self, color, center, radius, width=0):
+        """
+        Draws a circle
+        @param color The color, an (r, g, b) tuple or a color name
+        @param center The center of the circle
+        @param radius The radius of the circle
+        @param width The width of the outline, 0 fills the circle
+        """
+        pass
+
+    def line(self, color, start, end, width=1):
+        """
+        Draws a line
+        @param color The color, an (r, g, b) tuple or a color name
+        @param start The start of the line
+        @param end The end of the line
+        @param width The width of the line
+        """
+        pass
+
+    def lines(self, color, closed, points, width=1):
+        """
+        Draws connected lines
+        @param color The color, an (r, g, b) tuple or a color name
+        @param closed Defines if the last point is connected to the first
+        @param points The list of points, at least two
+        @param width The width of the lines
+        """
+        pass
+
+    def polygon(self, color, points, width=0):
+        """
+        Draws a polygon
+        @param color The color, an (r, g, b) tuple or a color name
+        @param points The vertices of the polygon
+        @param width The width of the outline, 0 fills the polygon
+        """
+        pass
+
+    def text(self, text, position, color):
+        """
+        Draws a line of text
+        @param text The text
+        @param position The top left corner of the text
+        @param color The color, an (r, g, b) tuple or a color name
+        """
+        pass
+
+    def capture(self):
+        """
+        Copies what has been drawn, for playback
+        @return The copy (None when nothing is drawn)
+        """
+        return None
+
+    def show(self, frame):
+        """
+        Draws a copy made by capture
+        @param frame The copy
+        """
+        pass
+
+    def present(self):
+        """
+        Finishes a frame, shows (or stores) what has been drawn
+        """
+        pass
+
+    def pressed(self, key):
+        """
+        Checks if a key is held down
+        @param key The name of the key ("space", "left", "right" or
+        "escape")
+        @return True if the key is held down
+        """
+        return False
+
+    def quitRequested(self):
+        """
+        Handles the pending window events
+        @return True if the window was closed
+        """
+        return False
+
+
+class SurfaceRenderer(NullRenderer):
+    """
+    Renderer that draws on a pygame surface
+    """
+
+    visual = True
+
+    def __init__(self, _dim, _surface=None):
+        """
+        Creates a new renderer
+        @param _dim The (width, height) of the drawing area
+        @param _surface The surface that is drawn on (an offscreen
+        surface is made when not given)
+        """
+        NullRenderer.__init__(self, _dim)
+        importPygame()
+
+        ## The surface that is drawn on
+        self.surface = _surface
+        if _surface is None:
+            self.surface = pygame.Surface(self.dim)
+
+        ## The font used for text (made the first time it is needed)
+        self.font = None
+
+    def color(self, color):
+        """
+        Looks up a color by name
+        @param color An (r, g, b) tuple or a pygame color name
+        @return The (r, g, b) tuple
+        """
+        if isinstance(color, str):
+            return pygame.color.THECOLORS[color]
+        return color
+
+    def fill(self, color):
+        self.surface.fill(self.color(color))
+
+    def circle(self, color, center, radius, width=0):
+        pygame.draw.circle(
+            self.surface,
+            self.color(color),
+            center,
+            radius,
+            width
+        )
+
+    def line(self, color, start, end, width=1):
+        pygame.draw.line(self.surface, self.color(color), start, end, width)
+
+    def lines(self, color, closed, points, width=1):
+        pygame.draw.lines(
+            self.surface,
+            self.color(color),
+            closed,
+            points,
+            width
+        )
+
+    def polygon(self, color, points, width=0):
+        pygame.draw.polygon(self.surface, self.color(color), points, width)
+
+    def text(self, text, position, color):
+        if self.font is None:
+            pygame.font.init()
+            self.font = pygame.font.Font(None, 50)
+        self.surface.blit(
+            self.font.render(text, 0, self.color(color)),
+            position
+        )
+
+    def capture(self):
+        return self.surface.copy()
+
+    def show(self, frame):
+        self.surface.blit(frame, (0, 0))
+
+
+class PygameRenderer(SurfaceRenderer):
+    """
+    Renderer that draws in a pygame window
+    """
+
+    interactive = True
+
+    ## Maps the key names to the pygame key constants
+    keys = {
+        "space": "K_SPACE",
+        "left": "K_LEFT",
+        "right": "K_RIGHT",
+        "escape": "K_ESCAPE"
+    }
+
+    def __init__(self, _dim):
+        """
+        Opens the window
+        @param _dim The (width, height) of the window
+        """
+        importPygame()
+        pygame.init()
+        SurfaceRenderer.__init__(self, _dim, pygame.display.set_mode(_dim))
+
+    def setCaption(self, caption):
+        pygame.display.set_caption(caption)
+
+    def present(self):
+        pygame.display.flip()
+
+    def pressed(self, key):
+        return bool(
+            pygame.key.get_pressed()[getattr(pygame, self.keys[key])]
+        )
+
+    def quitRequested(self):
+        return any(e.type == pygame.QUIT for e in pygame.event.get())
+
+
+class FileRenderer(SurfaceRenderer):
+    """
+    Renderer that draws offscreen and saves every frame to an image file,
+    without a display
+    """
+
+    def __init__(self, _dim, _pattern="frames/frame_%05d.png"):
+        """
+        Creates a new renderer
+        @param _dim The (width, height) of the images
+        @param _pattern Path of the images, formatted with the frame number
+        """
+        SurfaceRenderer.__init__(self, _dim)
+
+        ## Path of the images, formatted with the frame number
+        self.pattern = _pattern
+
+        ## Number of the next frame
+        self.frameNumber = 0
+
+    def present(self):
+        path = self.pattern % self.frameNumber
+        folder = os.path.dirname(path)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder)
+        pygame.image.save(self.surface, path)
+        self.frameNumber += 1
+
+
+class Throttle:
+    """
+    Wraps a function so that it is called at most a number of times per
+    second. Calls in between are dropped, except that the last dropped
+    call can be made later with flush. Used to limit how often progress
+    is redrawn
+    """
+    def __init__(self, _function, _rate):
+        """
+        Wraps a function
+        @param _function The function
+        @param _rate The largest number of calls per second
+        """
+
+        ## The wrapped function
+        self.function = _function
+
+        ## Smallest number of seconds between two calls
+        self.interval = 1.0 / _rate
+
+        ## Time of the last call (None before the first one)
+        self.last = None
+
+        ## Arguments of the last dropped call (None when the last call
+        ## was made)
+        self.pending = None
+
+    def __call__(self, *args):
+        now = time.time()
+        if self.last is not None and now - self.last < self.interval:
+            self.pending = args
+            return
+        self.last = now
+        self.pending = None
+        self.function(*args)
+
+    def flush(self):
+        """
+        Makes the last dropped call, if the call after it was not made,
+        so the final state is always shown
+        """
+        if self.pending is not None:
+            args, self.pending = self.pending, None
+            self.last = time.time()
+            self.function(*args)
+
+
+## Renderers that can be selected by name
+RENDERERS = {
+    "null": NullRenderer,
+    "pygame": PygameRenderer,
+    "file": FileRenderer
+}
+
+
+def makeRenderer(name, dim, framePattern=None):
+    """
+    Creates a renderer by name
+    @param name One of the keys of RENDERERS
+    @param dim The (width, height) of the drawing area
+    @param framePattern Path of the images of the file renderer
+    (the default of FileRenderer when not given)
+    @return The renderer
+    """
+    if name not in RENDERERS:
+        raise ValueError("unknown renderer " + str(name))
+    if name == "file" and framePattern is not None:
+        return FileRenderer(dim, framePattern)
+    return RENDERERS[name](dim)
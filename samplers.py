@@ -0,0 +1,368 @@
+__author__ = "amritansh"
+
+import random
+
+
+class UniformSampler:
+    """
+    Draws the sample points of the roadmap uniformly at random over the
+    screen. The other samplers extend it, they get the clearance of
+    candidate points from the PRMGenerator to decide which to keep
+    """
+    def __init__(self, _xSize, _ySize, _clearance, _minClearance):
+        """
+        Creates a new sampler
+        @param _xSize The size of the x component of the screen
+        @param _ySize The size of the y component of the screen
+        @param _clearance Function that gets the closest static obstacle
+        points and the signed distances to them for a list of positions
+        @param _minClearance Distance to the static obstacles that a
+        sample point needs to be kept
+        """
+
+        ## Horizontal size of the screen
+        self.xSize = _xSize
+
+        ## Vertical size of the screen
+        self.ySize = _ySize
+
+        ## Gets the closest points and signed distances of positions
+        self.clearance = _clearance
+
+        ## Smallest distance to the static obstacles of a free position
+        self.minClearance = _minClearance
+
+    def getRandom(self, p, q):
+        """
+        Gets a random number and cathes the ValueError
+        if the two numbers are the same
+        @param p Lower bound for the random number
+        @param q upper bound for the random number
+        @return A random number
+        """
+        try:
+            return random.randint(int(p), int(q))
+        except ValueError:
+            return int(p)
+
+    def clamp(self, p):
+        """
+        Moves a position onto the screen
+        @param p The position
+        @return The closest integer position on the screen
+        """
+        return (
+            int(min(max(p[0], 0), self.xSize)),
+            int(min(max(p[1], 0), self.ySize))
+        )
+
+    def free(self, posList):
+        """
+        Checks which positions are far enough from the static obstacles
+        @param posList The list of positions
+        @return A list of booleans, True for the free positions
+        """
+        return [d >= self.minClearance for d in self.clearance(posList)[1]]
+
+    def uniform(self, num):
+        """
+        Draws positions uniformly at random
+        @param num The number of positions
+        @return A list of positions
+        """
+        return [
+            (
+                self.getRandom(0, self.xSize),
+                self.getRandom(0, self.ySize)
+            ) for _ in range(num)
+        ]
+
+    def generate(self, num):
+        """
+        Generates the positions of new sample points
+        @param num The number of points to generate
+        @return A list of positions
+        """
+        return self.uniform(num)
+
+
+class HaltonSampler(UniformSampler):
+    """
+    Draws the sample points from the two dimensional Halton sequence
+    (bases 2 and 3). Its points cover the screen far more evenly than
+    random ones, so fewer of them are needed to reach every open area.
+    The sequence is shifted by a random offset (modulo 1) so different
+    seeds give different roadmaps, and later calls continue it
+    """
+    def __init__(self, _xSize, _ySize, _clearance, _minClearance):
+        UniformSampler.__init__(
+            self,
+            _xSize,
+            _ySize,
+            _clearance,
+            _minClearance
+        )
+
+        ## Index of the next point of the sequence
+        self.index = 1
+
+        ## Random offset added to every point of the sequence
+        self.offset = (random.random(), random.random())
+
+    def radicalInverse(self, k, base):
+        """
+        Mirrors the digits of an integer around the decimal point
+        @param k The integer
+        @param base The base of the digits
+        @return A number between 0 and 1
+        """
+        value, scale = 0.0, 1.0 / base
+        while k > 0:
+            k, digit = divmod(k, base)
+            value += digit * scale
+            scale /= base
+        return value
+
+    def generate(self, num):
+        posList = list()
+        for k in range(self.index, self.index + num):
+            posList.append((
+                int((self.radicalInverse(k, 2) + self.offset[0]) % 1 *
+                    self.xSize),
+                int((self.radicalInverse(k, 3) + self.offset[1]) % 1 *
+                    self.ySize)
+            ))
+        self.index += num
+        return posList
+
+
+class GaussianSampler(UniformSampler):
+    """
+    Gaussian sampling. A second point is drawn at a normally distributed
+    offset from every uniform point, and the free one of the two is kept
+    when the other one is not free. The sample points end up close to the
+    obstacle boundaries, where the roadmap needs them to get around the
+    obstacles, instead of in the open areas. A share of the points is
+    still drawn uniformly so the open areas (and the start and end
+    goals in them) stay connected
+    """
+    def __init__(
+        self,
+        _xSize,
+        _ySize,
+        _clearance,
+        _minClearance,
+        _sigma=20,
+        _rounds=20,
+        _uniformShare=0.25
+    ):
+        """
+        Creates a new sampler
+        @param _sigma Standard deviation of the offset of the second point
+        @param _rounds Number of batches of candidates that are drawn
+        before the missing points are drawn uniformly
+        @param _uniformShare Share of the points that are drawn uniformly
+        """
+        UniformSampler.__init__(
+            self,
+            _xSize,
+            _ySize,
+            _clearance,
+            _minClearance
+        )
+
+        ## Standard deviation of the offset of the second point
+        self.sigma = _sigma
+
+        ## Number of batches of candidates drawn in one generate call
+        self.rounds = _rounds
+
+        ## Share of the points that are drawn uniformly
+        self.uniformShare = _uniformShare
+
+    def pairs(self, num):
+        """
+        Draws uniform points with a second point close to each of them
+        @param num The number of pairs
+        @return A list of the first points and a list of the second points
+        """
+        first = self.uniform(num)
+        second = [
+            self.clamp((
+                p[0] + random.gauss(0, self.sigma),
+                p[1] + random.gauss(0, self.sigma)
+            )) for p in first
+        ]
+        return first, second
+
+    def accept(self, first, second):
+        """
+        Picks the sample points out of a batch of pairs
+        @param first The list of the first points
+        @param second The list of the second points
+        @return A list of the accepted positions
+        """
+        free = self.free(first + second)
+        n = len(first)
+        return [
+            first[k] if free[k] else second[k]
+            for k in range(n) if free[k] != free[n + k]
+        ]
+
+    def generate(self, num):
+        biased = num - int(num * self.uniformShare)
+        posList = list()
+        for _ in range(self.rounds):
+            if len(posList) >= biased:
+                break
+            posList += self.accept(*self.pairs(biased))
+        posList = posList[:biased]
+        return posList + self.uniform(num - len(posList))
+
+
+class BridgeSampler(GaussianSampler):
+    """
+    Bridge test sampling. The midpoint of a pair of points is kept when
+    it is free and both ends of the pair are not, so the sample points
+    fall in the narrow passages between obstacles that uniform sampling
+    rarely hits
+    """
+    def __init__(
+        self,
+        _xSize,
+        _ySize,
+        _clearance,
+        _minClearance,
+        _sigma=40,
+        _rounds=20,
+        _uniformShare=0.25
+    ):
+        GaussianSampler.__init__(
+            self,
+            _xSize,
+            _ySize,
+            _clearance,
+            _minClearance,
+            _sigma,
+            _rounds,
+            _uniformShare
+        )
+
+    def accept(self, first, second):
+        free = self.free(first + second)
+        n = len(first)
+        mid = [
+            ((first[k][0] + second[k][0]) / 2,
+             (first[k][1] + second[k][1]) / 2)
+            for k in range(n) if not free[k] and not free[n + k]
+        ]
+        return [p for p, f in zip(mid, self.free(mid)) if f]
+
+
+class MedialAxisSampler(UniformSampler):
+    """
+    Moves uniform sample points onto the medial axis of the free space,
+    where they are as far from the obstacles as possible. A point is
+    pushed directly away from its closest obstacle point until that
+    point changes, which happens once it crosses the medial axis. The
+    edges of the screen count as obstacles too. The crossing is found by
+    bisection for the whole batch at once
+    """
+    def __init__(
+        self,
+        _xSize,
+        _ySize,
+        _clearance,
+        _minClearance,
+        _iterations=8
+    ):
+        """
+        Creates a new sampler
+        @param _iterations Number of bisection steps
+        """
+        UniformSampler.__init__(
+            self,
+            _xSize,
+            _ySize,
+            _clearance,
+            _minClearance
+        )
+
+        ## Number of bisection steps
+        self.iterations = _iterations
+
+    def retract(self, posList):
+        """
+        Moves positions onto the medial axis. Positions inside of the
+        static obstacles (or without any static obstacle) do not move
+        @param posList The list of positions
+        @return A list of the moved positions
+        """
+        closest, dist = self.clearance(posList)
+        moving = [
+            k for k in range(len(posList))
+            if dist[k] > 0 and dist[k] != float("inf")
+        ]
+        direction = dict(
+            (k, (
+                (posList[k][0] - closest[k][0]) / dist[k],
+                (posList[k][1] - closest[k][1]) / dist[k]
+            )) for k in moving
+        )
+        # the closest point does not change before the medial axis, so
+        # the distance grows as much as the point moves (and stays
+        # smaller than the distance to the edges of the screen)
+        border = lambda p: min(
+            p[0], self.xSize - p[0], p[1], self.ySize - p[1]
+        )
+        lo = dict((k, 0.0) for k in moving)
+        hi = dict((k, float(max(self.xSize, self.ySize))) for k in moving)
+        move = lambda k, t: (
+            posList[k][0] + direction[k][0] * t,
+            posList[k][1] + direction[k][1] * t
+        )
+        for _ in range(self.iterations):
+            if not moving:
+                break
+            mid = dict((k, (lo[k] + hi[k]) / 2) for k in moving)
+            newPos = [move(k, mid[k]) for k in moving]
+            newDist = self.clearance(newPos)[1]
+            for k, p, d in zip(moving, newPos, newDist):
+                if d >= dist[k] + mid[k] - 1e-6 and border(p) >= d:
+                    lo[k] = mid[k]
+                else:
+                    hi[k] = mid[k]
+        posList = list(posList)
+        for k in moving:
+            posList[k] = self.clamp(move(k, lo[k]))
+        return posList
+
+    def generate(self, num):
+        return self.retract(self.uniform(num))
+
+
+## Samplers that can be selected by name
+SAMPLERS = {
+    "uniform": UniformSampler,
+    "halton": HaltonSampler,
+    "gaussian": GaussianSampler,
+    "bridge": BridgeSampler,
+    "medial_axis": MedialAxisSampler
+}
+
+
+def makeSampler(name, xSize, ySize, clearance, minClearance):
+    """
+    Creates a sampler by name
+    @param name One of the keys of SAMPLERS
+    @param xSize The size of the x component of the screen
+    @param ySize The size of the y component of the screen
+    @param clearance Function that gets the closest static obstacle
+    points and the signed distances to them for a list of positions
+    @param minClearance Distance to the static obstacles that a sample
+    point needs to be kept
+    @return The sampler
+    """
+    if name not in SAMPLERS:
+        raise ValueError("unknown sampler " + str(name))
+    return SAMPLERS[name](xSize, ySize, clearance, minClearance)
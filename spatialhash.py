@@ -0,0 +1,91 @@
+__author__ = "amritansh"
+
+import math as np
+
+
+class SpatialHash:
+    """
+    Uniform grid that buckets the boids of a flock by position so that
+    the boids within a small radius of a point can be found without
+    checking the whole flock
+    """
+    def __init__(self, _cellSize):
+        """
+        Creates an empty SpatialHash
+        @param _cellSize The width and height of a grid cell. Queries are
+        cheapest when the radius is no larger than the cell size
+        """
+
+        ## The width and height of a grid cell
+        self.cellSize = float(_cellSize)
+
+        ## Dictionary that maps a cell to the indexes stored in it
+        self.cells = dict()
+
+    def getCell(self, p):
+        """
+        Gets the cell that a point falls in
+        @param p The point
+        @return The cell as an (x, y) tuple
+        """
+        return (
+            int(np.floor(p[0] / self.cellSize)),
+            int(np.floor(p[1] / self.cellSize))
+        )
+
+    def rebuild(self, posList):
+        """
+        Empties the grid and inserts every position in the list
+        @param posList List of positions, the index of a position in the
+        list is the index stored in the grid
+        """
+        self.cells = dict()
+        for i, p in enumerate(posList):
+            self.insert(i, p)
+
+    def insert(self, i, p):
+        """
+        Inserts an index into the grid
+        @param i The index to be stored
+        @param p The position of the index
+        """
+        self.cells.setdefault(self.getCell(p), list()).append(i)
+
+    def remove(self, i, p):
+        """
+        Removes an index from the grid
+        @param i The index to be removed
+        @param p The position that the index was inserted with
+        """
+        cell = self.getCell(p)
+        self.cells[cell].remove(i)
+        if not self.cells[cell]:
+            del self.cells[cell]
+
+    def move(self, i, pOld, pNew):
+        """
+        Updates the cell of an index after its position changed
+        @param i The index that moved
+        @param pOld The previous position of the index
+        @param pNew The new position of the index
+        """
+        if self.getCell(pOld) != self.getCell(pNew):
+            self.remove(i, pOld)
+            self.insert(i, pNew)
+
+    def query(self, p, r):
+        """
+        Gets the indexes that might be within a radius of a point. The
+        caller still has to check the exact distance
+        @param p The point to be checked
+        @param r The radius around the point
+        @return A sorted list of candidate indexes
+        """
+        xMin, yMin = self.getCell((p[0] - r, p[1] - r))
+        xMax, yMax = self.getCell((p[0] + r, p[1] + r))
+        candidates = list()
+        for x in range(xMin, xMax + 1):
+            for y in range(yMin, yMax + 1):
+                candidates.extend(self.cells.get((x, y), ()))
+        candidates.sort()
+        return candidates
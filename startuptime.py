@@ -0,0 +1,77 @@
+__author__ = "amritansh"
+
+import subprocess
+import sys
+import time
+
+## Modules whose import time is measured, from the geometry up to the
+## whole simulation
+modules = [
+    "geometry",
+    "obstacle",
+    "dijkstra",
+    "prm",
+    "mapparser",
+    "configuration",
+    "boidsimulation"
+]
+
+## Prints the import time of a module (and if pygame was loaded with it)
+importScript = (
+    "import sys, time\n"
+    "t = time.time()\n"
+    "import {0}\n"
+    "print time.time() - t, 'pygame' in sys.modules\n"
+)
+
+
+def importTime(module, runs=5):
+    """
+    Measures how long a module takes to import in a fresh interpreter
+    @param module The name of the module
+    @param runs The number of interpreters the time is averaged over
+    @return The average import time in seconds and wether pygame was
+    loaded by the import
+    """
+    total, pygame = 0.0, False
+    for _ in range(runs):
+        # pygame can print a banner, the result is on the last line
+        out = subprocess.check_output(
+            [sys.executable, "-c", importScript.format(module)]
+        ).splitlines()[-1].split()
+        total += float(out[0])
+        pygame = pygame or out[1] == "True"
+    return total / runs, pygame
+
+
+def workerStartTime(module, workers=32):
+    """
+    Measures how long it takes to start worker processes that import a
+    module, all at the same time
+    @param module The name of the module
+    @param workers The number of worker processes
+    @return The time until every worker has exited, in seconds
+    """
+    startTime = time.time()
+    procs = [
+        subprocess.Popen([sys.executable, "-c", "import " + module])
+        for _ in range(workers)
+    ]
+    for p in procs:
+        p.wait()
+    return time.time() - startTime
+
+
+if __name__ == "__main__":
+    for module in modules:
+        seconds, pygame = importTime(module)
+        print "%-16s %7.1f ms%s" % (
+            module,
+            1000 * seconds,
+            "  (loads pygame)" if pygame else ""
+        )
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    print "%d workers importing prm: %.2f s" % (
+        workers,
+        workerStartTime("prm", workers)
+    )
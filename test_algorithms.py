@@ -0,0 +1,437 @@
+__author__ = "amritansh"
+
+import random
+import sys
+
+import numpy
+
+import boid
+import boidsimulation as bs
+import bvh
+import csrgraph
+import dijkstra
+import dstarlite
+import flockengine
+import geometry
+import mapparser as mp
+from prm import PenaltyRoadmap
+
+"""
+Checks the batched and incremental algorithms against the per object code
+they replace, on random inputs. Run with an optional random seed:
+python test_algorithms.py [seed]
+"""
+
+INF = float("inf")
+
+## Maps used for the obstacle checks
+mapFiles = [
+    "maps/scene1.map",
+    "maps/maze.map",
+    "maps/random.map",
+    "maps/hurdles.map"
+]
+
+## Start and end points of the maps used for the flock checks
+flockMaps = {
+    "maps/scene1.map": ((50, 50), (980, 30)),
+    "maps/maze.map": ((50, 50), (950, 30)),
+    "maps/hurdles.map": ((60, 270), (950, 270))
+}
+
+
+def randomGraph(n, degree):
+    """
+    Makes a random directed graph, with some edges only going one way
+    @param n The number of nodes
+    @param degree The number of edges leaving every node
+    @return Dictionary that maps a node to its neighbours and edge weights
+    """
+    graph = dict((k, dict()) for k in range(n))
+    for k in range(n):
+        for p in random.sample(range(n), min(degree, n)):
+            if p != k:
+                graph[k][p] = random.uniform(1, 10)
+                if random.random() < 0.8:
+                    graph[p][k] = graph[k][p]
+    return graph
+
+
+def pathCost(graph, path, start, end):
+    """
+    Gets the weight of a path
+    @param graph The graph the path is on
+    @param path A list of nodes
+    @param start The node the path has to start at
+    @param end The node the path has to end at
+    @return The weight, infinite when it is not a path from start to end
+    """
+    if not path or path[0] != start or path[-1] != end:
+        return INF
+    cost = 0
+    for u, v in zip(path, path[1:]):
+        if v not in graph[u]:
+            return INF
+        cost += graph[u][v]
+    return cost
+
+
+def sameCost(a, b):
+    return a == b or abs(a - b) <= 1e-9 * max(abs(a), abs(b))
+
+
+def checkDStarLite(trials):
+    """
+    Compares D* Lite on a penalized view (with edges removed along the
+    way) against dijkstra.shortestPath on the same view
+    @param trials The number of random graphs
+    @return The number of mismatches
+    """
+    failed = 0
+    for _ in range(trials):
+        graph = randomGraph(random.randint(2, 80), random.randint(1, 6))
+        nodes = graph.keys()
+
+        # seeded with the shortest path tree, as the PRM does
+        goal = random.choice(nodes)
+        predecessors = csrgraph.CSRGraph(graph, True)
+        dist, pred = predecessors.search(goal)
+        seed = dict(
+            (k, dist[k]) for k in range(predecessors.size) if dist[k] < INF
+        )
+        view = PenaltyRoadmap(graph)
+        view.search = dstarlite.DStarLite(view, goal, predecessors, seed)
+        for _ in range(10):
+            for k in random.sample(nodes, min(3, len(nodes))):
+                view.penalize(k, random.choice([2, 3]))
+            if random.random() < 0.5:
+                u = random.choice(nodes)
+                if graph[u]:
+                    graph[u].pop(random.choice(graph[u].keys()))
+                    view.edgesChanged(u)
+            start = random.choice(nodes)
+            expected = pathCost(
+                view,
+                dijkstra.shortestPath(view, start, goal),
+                start,
+                goal
+            )
+            found = pathCost(view, view.search.getPath(start), start, goal)
+            failed += not sameCost(expected, found)
+    return failed
+
+
+def checkCSR(trials):
+    """
+    Compares the CSR graph search against dijkstra.shortestPath
+    @param trials The number of random graphs
+    @return The number of mismatches
+    """
+    failed = 0
+    for _ in range(trials):
+        graph = randomGraph(random.randint(2, 80), random.randint(1, 6))
+        nodes = graph.keys()
+        packed = csrgraph.CSRGraph(graph)
+        for _ in range(10):
+            start, end = random.choice(nodes), random.choice(nodes)
+            expected = pathCost(
+                graph,
+                dijkstra.shortestPath(graph, start, end),
+                start,
+                end
+            )
+            found = pathCost(
+                graph,
+                packed.shortestPath(start, end),
+                start,
+                end
+            )
+            failed += not sameCost(expected, found)
+    return failed
+
+
+def randomPoints(n):
+    return [
+        (random.randint(0, 1000), random.randint(0, 600)) for _ in range(n)
+    ]
+
+
+def randomSegments(n):
+    """
+    Makes random segments, half of them short so that most of those miss
+    every obstacle
+    @param n The number of segments
+    @return Lists of the starting and the ending points
+    """
+    starts, ends = randomPoints(n), randomPoints(n)
+    ends[::2] = [
+        (s[0] + random.randint(-60, 60), s[1] + random.randint(-60, 60))
+        for s in starts[::2]
+    ]
+    return starts, ends
+
+
+def checkEdgeBuffer(samples):
+    """
+    Compares the approximate closest points and point in polygon tests of
+    the packed obstacle edges against getPoint and pointInPoly of every
+    obstacle, on the maps of mapFiles
+    @param samples The number of random points per map
+    @return The number of mismatches
+    """
+    failed = 0
+    for mapFile in mapFiles:
+        obstacles = mp.mparse(mapFile)
+        edges = geometry.EdgeBuffer([ob.nodes for ob in obstacles])
+        points = randomPoints(samples)
+        _, dist, _ = edges.closestPoints(points, True)
+        inside = edges.pointsInPolygons(points, True)
+        for k, p in enumerate(points):
+            expected = min(ob.norm(p, ob.getPoint(p)) for ob in obstacles)
+            failed += not sameCost(expected, dist[k])
+            failed += list(inside[k]) != [
+                bool(ob.pointInPoly(p)) for ob in obstacles
+            ]
+    return failed
+
+
+def randomBox(size):
+    x, y = random.uniform(0, 1000), random.uniform(0, 600)
+    return [x, y, x + random.uniform(0, size), y + random.uniform(0, size)]
+
+
+def checkBVH(trials):
+    """
+    Compares the BVH queries against a linear scan of the boxes, with some
+    of the boxes moved after the tree is built
+    @param trials The number of random trees
+    @return The number of mismatches
+    """
+    failed = 0
+    for _ in range(trials):
+        boxes = [randomBox(80) for _ in range(random.randint(0, 60))]
+        tree = bvh.BVH(boxes)
+        for k in random.sample(range(len(boxes)), len(boxes) / 4):
+            boxes[k] = randomBox(80)
+            tree.update(k, boxes[k])
+        for _ in range(20):
+            box = randomBox(200)
+            p, q = randomBox(300)[:2], randomBox(300)[:2]
+            r = random.uniform(0, 100)
+            scan = lambda touches: [
+                k for k, b in enumerate(boxes) if touches(b)
+            ]
+            failed += tree.queryBox(box) != scan(lambda b: (
+                b[0] <= box[2] and box[0] <= b[2] and
+                b[1] <= box[3] and box[1] <= b[3]
+            ))
+            failed += tree.queryPoint(p, r) != scan(lambda b: (
+                max(b[0] - p[0], 0, p[0] - b[2]) ** 2 +
+                max(b[1] - p[1], 0, p[1] - b[3]) ** 2 <= r * r
+            ))
+            # the segment query is conservative, it has to hold every box
+            # that a point of the segment is in
+            along = set(tree.querySegment(p, q))
+            for t in numpy.linspace(0, 1, 50):
+                x = p[0] + t * (q[0] - p[0])
+                y = p[1] + t * (q[1] - p[1])
+                failed += not set(scan(lambda b: (
+                    b[0] <= x <= b[2] and b[1] <= y <= b[3]
+                ))) <= along
+    return failed
+
+
+def checkObstacleTree(samples):
+    """
+    Checks that the obstacles an ObstacleTree finds along a segment hold
+    every obstacle that detectCollision reports, on the maps of mapFiles
+    @param samples The number of random segments per map
+    @return The number of mismatches
+    """
+    failed = 0
+    for mapFile in mapFiles:
+        obstacles = mp.mparse(mapFile)
+        tree = bvh.ObstacleTree(obstacles)
+        for s, e in zip(*randomSegments(samples)):
+            failed += any(
+                ob.detectCollision(s, e) for ob in obstacles
+            ) != any(
+                ob.detectCollision(s, e) for ob in tree.alongSegment(s, e)
+            )
+    return failed
+
+
+def checkSegmentsCollide(samples):
+    """
+    Compares EdgeBuffer.segmentsCollide against detectCollision of every
+    obstacle, on the maps of mapFiles
+    @param samples The number of random segments per map
+    @return The number of mismatches
+    """
+    failed = 0
+    for mapFile in mapFiles:
+        obstacles = mp.mparse(mapFile)
+        edges = geometry.EdgeBuffer([ob.nodes for ob in obstacles])
+        starts, ends = randomSegments(samples)
+        hit = edges.segmentsCollide(starts, ends)
+        for s, e, h in zip(starts, ends, hit):
+            failed += bool(h) != any(
+                ob.detectCollision(s, e) for ob in obstacles
+            )
+    return failed
+
+
+def checkFindMax(trials):
+    """
+    Compares flockengine.findMaxIndexes against Boid.findMax, on scores
+    with many ties and zeros
+    @param trials The number of random score arrays
+    @return The number of mismatches
+    """
+    failed = 0
+    findMax = boid.Boid.findMax.im_func
+    for _ in range(trials):
+        m, n = random.randint(1, 20), random.randint(1, 30)
+        k = random.randint(1, n)
+        score = numpy.random.randint(0, 4, (m, n)).astype(float)
+        if random.random() < 0.5:
+            score *= numpy.random.rand(m, n)
+        picked = flockengine.findMaxIndexes(score, k)
+        for row, indexes in zip(score, picked):
+            failed += list(indexes) != findMax(None, list(row), k)
+    return failed
+
+
+class ReversedFlockSim(bs.FlockSim):
+    """
+    FlockSim that updates the boids of a synchronous frame from the last
+    one to the first
+    """
+    def stepSynchronous(self):
+        for state, b in zip(self.readBuffer, self.config.boidList):
+            state.load(b)
+        self.boidGrid.rebuild([state.position for state in self.readBuffer])
+        map(lambda b: b.update(), reversed(self.config.boidList))
+
+
+def runFlock(seed, mapFile, frames, flockSim=bs.FlockSim, **kwargs):
+    """
+    Builds a flock on a map and steps it without drawing it
+    @param seed The random seed the roadmap and the flock are built with.
+    The checks use fixed seeds, as test_sim.py does, since with some seeds
+    a roadmap sample lands on the start position of a boid
+    @param mapFile The map, one of the keys of flockMaps
+    @param frames The number of frames that are stepped
+    @param flockSim The FlockSim class that is used
+    @param kwargs The options of the FlockSim (engine, step_mode, ...)
+    @return Arrays (N, 2) of the positions and the headings of the boids
+    """
+    random.seed(seed)
+    numpy.random.seed(seed)
+    startPoint, endPoint = flockMaps[mapFile]
+    fs = flockSim(
+        20,
+        startPoint,
+        endPoint,
+        map_file=mapFile,
+        renderer="null",
+        **kwargs
+    )
+    fs.iterations = frames
+    fs.render()
+    return (
+        numpy.array([b.position for b in fs.config.boidList]),
+        numpy.array([b.heading for b in fs.config.boidList])
+    )
+
+
+def sameFlock(a, b):
+    return all(numpy.allclose(x, y, rtol=0, atol=1e-6) for x, y in zip(a, b))
+
+
+def checkVectorized(frames, seeds):
+    """
+    Compares the vectorized FlockEngine against Boid.update in the
+    synchronous step mode (the engine always steps synchronously), on the
+    maps of flockMaps
+    @param frames The number of frames that are stepped
+    @param seeds The random seeds the flocks are built with
+    @return The number of mismatches
+    """
+    failed = 0
+    for mapFile in sorted(flockMaps):
+        for seed in seeds:
+            failed += not sameFlock(
+                runFlock(seed, mapFile, frames, step_mode="synchronous"),
+                runFlock(seed, mapFile, frames, engine="vectorized")
+            )
+    return failed
+
+
+def checkSynchronous(frames, seeds):
+    """
+    Checks that the synchronous step mode does not depend on the order
+    the boids are updated in, on the maps of flockMaps
+    @param frames The number of frames that are stepped
+    @param seeds The random seeds the flocks are built with
+    @return The number of mismatches
+    """
+    failed = 0
+    for mapFile in sorted(flockMaps):
+        for seed in seeds:
+            failed += not sameFlock(
+                runFlock(seed, mapFile, frames, step_mode="synchronous"),
+                runFlock(
+                    seed,
+                    mapFile,
+                    frames,
+                    ReversedFlockSim,
+                    step_mode="synchronous"
+                )
+            )
+    return failed
+
+
+def checkParallel(frames, seeds):
+    """
+    Compares the ParallelFlockEngine (with two workers) against the
+    vectorized FlockEngine, on the maps of flockMaps. FlockSim.render
+    stops the worker pool after the last frame
+    @param frames The number of frames that are stepped
+    @param seeds The random seeds the flocks are built with
+    @return The number of mismatches
+    """
+    failed = 0
+    for mapFile in sorted(flockMaps):
+        for seed in seeds:
+            failed += not sameFlock(
+                runFlock(seed, mapFile, frames, engine="vectorized"),
+                runFlock(seed, mapFile, frames, engine="parallel", workers=2)
+            )
+    return failed
+
+
+if __name__ == "__main__":
+    seed = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    print "SEED RANDOM: ", seed
+    random.seed(seed)
+    numpy.random.seed(seed)
+
+    checks = [
+        ("dstarlite", lambda: checkDStarLite(200)),
+        ("csr", lambda: checkCSR(200)),
+        ("edgebuffer", lambda: checkEdgeBuffer(500)),
+        ("bvh", lambda: checkBVH(100)),
+        ("obstacletree", lambda: checkObstacleTree(500)),
+        ("segments", lambda: checkSegmentsCollide(500)),
+        ("findMax", lambda: checkFindMax(500)),
+        ("vectorized", lambda: checkVectorized(20, [0, 1])),
+        ("synchronous", lambda: checkSynchronous(20, [0, 1])),
+        ("parallel", lambda: checkParallel(20, [0, 1]))
+    ]
+    failures = 0
+    for name, check in checks:
+        failed = check()
+        failures += failed
+        print name, "ok" if not failed else "%d mismatches" % failed
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,67 @@
+__author__ = "amritansh"
+
+
+class UnionFind:
+    """
+    Disjoint sets over the node indexes of a roadmap. Used to find out if
+    two nodes are connected while the roadmap grows, without searching
+    it. Sets are joined by size and paths are halved on every lookup, so
+    the operations take nearly constant time. Sets can only be joined,
+    removing an edge does not split them
+    """
+    def __init__(self, _size=0):
+        """
+        Creates a structure where every node is in a set of its own
+        @param _size The number of nodes, node indexes go from 0 to
+        size - 1
+        """
+
+        ## The parent of every node, a root is its own parent
+        self.parent = range(_size)
+
+        ## The number of nodes in the set of every root
+        self.size = [1] * _size
+
+    def grow(self, size):
+        """
+        Adds nodes in sets of their own until there are size nodes
+        @param size The new number of nodes
+        """
+        for k in range(len(self.parent), size):
+            self.parent.append(k)
+            self.size.append(1)
+
+    def find(self, node):
+        """
+        Gets the root of the set that a node is in
+        @param node The node index
+        @return The index of the root
+        """
+        parent = self.parent
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def union(self, a, b):
+        """
+        Joins the sets of two nodes
+        @param a The first node index
+        @param b The second node index
+        """
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+
+    def connected(self, a, b):
+        """
+        Checks if two nodes are in the same set
+        @param a The first node index
+        @param b The second node index
+        @return True if the nodes are connected
+        """
+        return self.find(a) == self.find(b)